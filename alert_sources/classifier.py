@@ -1,14 +1,72 @@
 import re
 
+from utils.message_id import make_message_id
+
 BROVARY_KEYWORDS = ["бровар", "бровари", "броварський"]
 KYIVREGION_KEYWORDS = ["київська область", "київщина"]
 
+# Відбій
+ALL_CLEAR_PATTERNS = [
+    r"відбій\s+тривоги",
+    r"відбій\s+повітряної\s+тривоги",
+    r"\bвідбій\b",
+    r"\bотбой\b",
+    r"тривога\s+(скасована|закінчена|відмінена)",
+    r"закінчення\s+тривоги"
+]
+
+# Глобальні загрози (можемо сигналізувати alarm навіть без району,
+# але у main.py все одно фільтруємо лише наші райони)
+GLOBAL_THREATS = ["міг", "авіація", "ракета", "іскандер", "балістик", "пуски", "пуск", "зліт", "кинжал", "калібр"]
+
+# Локальні загрози — враховуємо тільки якщо район наш
+LOCAL_THREATS = [
+    "шахед", "вибух", "детонац", "бомба", "удар",
+    "обстріл", "артилер", "міномет", "бпла", "ппо", "зеніт"
+]
+
+# ------- Правила компілюються один раз при імпорті -------
+_DISTRICTS = {
+    "brovary": "Броварський район",
+    "kyiv_region": "Київська область",
+}
+_DISTRICT_RE = re.compile(
+    r"\b(?:(?P<brovary>" + "|".join(BROVARY_KEYWORDS) + ")"
+    + r"|(?P<kyiv_region>" + "|".join(KYIVREGION_KEYWORDS) + r"))\b"
+)
+_ALL_CLEAR_RE = re.compile("|".join(f"(?:{p})" for p in ALL_CLEAR_PATTERNS))
+
+
+def _threat_rule(threats: list[str], prefix: str) -> re.Pattern:
+    # \b(?:(?P<g0>міг)|(?P<g1>авіація)|...)\w*\b — ім'я групи = індекс у списку
+    alternation = "|".join(f"(?P<{prefix}{i}>{t})" for i, t in enumerate(threats))
+    return re.compile(rf"\b(?:{alternation})\w*\b")
+
+
+_GLOBAL_THREAT_RE = _threat_rule(GLOBAL_THREATS, "g")
+_LOCAL_THREAT_RE = _threat_rule(LOCAL_THREATS, "l")
+
+
+def _first_threat(rx: re.Pattern, threats: list[str], lower: str):
+    """Загроза з найменшим індексом у списку серед усіх збігів (як послідовний
+    перебір списку), а не перша за позицією в тексті."""
+    best = None
+    for m in rx.finditer(lower):
+        idx = int(m.lastgroup[1:])
+        if best is None or idx < best:
+            best = idx
+            if best == 0:
+                break
+    return threats[best] if best is not None else None
+
+
 def _district_from_text(lower: str):
-    if any(re.search(rf"\b{w}\b", lower) for w in BROVARY_KEYWORDS):
-        return "Броварський район"
-    if any(re.search(rf"\b{w}\b", lower) for w in KYIVREGION_KEYWORDS):
-        return "Київська область"
-    return None
+    found = None
+    for m in _DISTRICT_RE.finditer(lower):
+        if m.lastgroup == "brovary":
+            return _DISTRICTS["brovary"]  # Бровари мають пріоритет
+        found = _DISTRICTS[m.lastgroup]
+    return found
 
 
 def classify_message(text: str, source_url: str):
@@ -26,23 +84,14 @@ def classify_message(text: str, source_url: str):
     district = _district_from_text(lower)
 
     # Відбій (тільки якщо наш район визначений)
-    all_clear_patterns = [
-        r"відбій\s+тривоги",
-        r"відбій\s+повітряної\s+тривоги",
-        r"\bвідбій\b",
-        r"\bотбой\b",
-        r"тривога\s+(скасована|закінчена|відмінена)",
-        r"закінчення\s+тривоги"
-    ]
-    for pattern in all_clear_patterns:
-        if re.search(pattern, lower) and district is not None:
-            return {
-                "district": district,
-                "text": text,
-                "url": source_url,
-                "id": hash(text + source_url),
-                "type": "all_clear"
-            }
+    if district is not None and _ALL_CLEAR_RE.search(lower):
+        return {
+            "district": district,
+            "text": text,
+            "url": source_url,
+            "id": make_message_id(text=text, url=source_url),
+            "type": "all_clear"
+        }
 
     # Пряма згадка тривоги (тільки якщо район наш або є загроза)
     if "повітряна тривога" in lower and district is not None:
@@ -50,42 +99,34 @@ def classify_message(text: str, source_url: str):
             "district": district,
             "text": text,
             "url": source_url,
-            "id": hash(text + source_url),
+            "id": make_message_id(text=text, url=source_url),
             "type": "alarm"
         }
 
-    # Глобальні загрози (можемо сигналізувати alarm навіть без району,
-    # але у main.py все одно фільтруємо лише наші райони)
-    global_threats = ["міг", "авіація", "ракета", "іскандер", "балістик", "пуски", "пуск", "зліт", "кинжал", "калібр"]
-    for threat in global_threats:
-        if re.search(rf"\b{threat}\w*\b", lower):
+    threat = _first_threat(_GLOBAL_THREAT_RE, GLOBAL_THREATS, lower)
+    if threat:
+        return {
+            "district": district,
+            "text": text,
+            "url": source_url,
+            "id": make_message_id(text=text, url=source_url),
+            "type": "alarm",
+            "threat_type": threat
+        }
+
+    threat = _first_threat(_LOCAL_THREAT_RE, LOCAL_THREATS, lower)
+    if threat:
+        if district:
             return {
                 "district": district,
                 "text": text,
                 "url": source_url,
-                "id": hash(text + source_url),
+                "id": make_message_id(text=text, url=source_url),
                 "type": "alarm",
                 "threat_type": threat
             }
-
-    # Локальні загрози — враховуємо тільки якщо район наш
-    local_threats = [
-        "шахед", "вибух", "детонац", "бомба", "удар",
-        "обстріл", "артилер", "міномет", "бпла", "ппо", "зеніт"
-    ]
-    for threat in local_threats:
-        if re.search(rf"\b{threat}\w*\b", lower):
-            if district:
-                return {
-                    "district": district,
-                    "text": text,
-                    "url": source_url,
-                    "id": hash(text + source_url),
-                    "type": "alarm",
-                    "threat_type": threat
-                }
-            else:
-                return None
+        else:
+            return None
 
     # Якщо є район, але без тривоги — інфо для нього
     if district:
@@ -93,7 +134,7 @@ def classify_message(text: str, source_url: str):
             "district": district,
             "text": text,
             "url": source_url,
-            "id": hash(text + source_url),
+            "id": make_message_id(text=text, url=source_url),
             "type": "info"
         }
 
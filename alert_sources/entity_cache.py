@@ -0,0 +1,117 @@
+# alert_sources/entity_cache.py
+import os
+import json
+import asyncio
+import tempfile
+
+from telethon import utils
+from telethon.errors import FloodWaitError
+from telethon.tl.types import InputPeerChannel
+
+ENTITY_CACHE_PATH = os.getenv("ENTITY_CACHE_PATH", "entity_cache.json")
+# Як часто перевіряти, чи не змінились id/access_hash каналів
+ENTITY_REFRESH_HOURS = float(os.getenv("ENTITY_REFRESH_HOURS", "24"))
+# Пауза між ResolveUsername, щоб не ловити FloodWait на довгому списку
+ENTITY_RESOLVE_PAUSE = float(os.getenv("ENTITY_RESOLVE_PAUSE", "1"))
+
+
+class EntityCache:
+    """Постійний кеш username → (peer_id, access_hash) для каналів з channels.json.
+
+    Старт і catch-up беруть InputPeerChannel з кешу без мережі; обробник
+    подій шукає канал за числовим peer_id (event.chat_id), а не за event.chat.
+    """
+
+    def __init__(self, path: str = ENTITY_CACHE_PATH):
+        self.path = path
+        self._by_username: dict[str, tuple[int, int]] = {}  # lower(username) -> (channel_id, access_hash)
+        self._by_peer_id: dict[int, str] = {}               # marked peer id (-100…) -> username
+
+    def load(self, usernames=()):
+        """usernames — канонічні імена з channels.json: username_for() повертає
+        саме їх, у якому б регістрі канал не лежав у файлі кешу."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        canonical = {u.lower(): u for u in usernames}
+        for username, (channel_id, access_hash) in data.items():
+            self._store(canonical.get(username.lower(), username), channel_id, access_hash)
+        print(f"[CFG] Loaded {len(self._by_username)} cached entities from {self.path}")
+
+    def save(self):
+        # ключі — імена як у channels.json (регістр зберігаємо)
+        data = {u: list(self._by_username[u.lower()]) for u in self._by_peer_id.values()}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".entities-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _store(self, username: str, channel_id: int, access_hash: int):
+        key = username.lower()
+        old = self._by_username.get(key)
+        if old is not None:
+            self._by_peer_id.pop(utils.get_peer_id(InputPeerChannel(*old)), None)
+        self._by_username[key] = (channel_id, access_hash)
+        self._by_peer_id[utils.get_peer_id(InputPeerChannel(channel_id, access_hash))] = username
+
+    def input_peer(self, username: str) -> InputPeerChannel | None:
+        cached = self._by_username.get(username.lower())
+        return InputPeerChannel(*cached) if cached else None
+
+    def username_for(self, peer_id: int) -> str | None:
+        return self._by_peer_id.get(peer_id)
+
+    def peers(self, usernames) -> list[InputPeerChannel]:
+        return [p for p in map(self.input_peer, usernames) if p is not None]
+
+    async def resolve(self, client, usernames, refresh: bool = False) -> bool:
+        """Дотягує з мережі відсутні (refresh=True — усі) канали. True — якщо кеш змінився."""
+        changed = False
+        for username in usernames:
+            if not refresh and username.lower() in self._by_username:
+                continue
+            while True:
+                try:
+                    entity = await client.get_entity(username)
+                    break
+                except FloodWaitError as e:
+                    # паузу вже відбули — повторюємо той самий канал, а не пропускаємо
+                    # його до наступного оновлення через ENTITY_REFRESH_HOURS
+                    print(f"⏳ Flood wait {e.seconds}s на ResolveUsername {username}")
+                    await asyncio.sleep(e.seconds)
+                except (ValueError, TypeError) as e:
+                    print(f"❌ Не вдалося знайти канал {username}: {e}")
+                    entity = None
+                    break
+            if entity is None:
+                continue
+            access_hash = getattr(entity, "access_hash", None)
+            if access_hash is None:
+                continue  # не канал/супергрупа
+            if self._by_username.get(username.lower()) != (entity.id, access_hash):
+                self._store(username, entity.id, access_hash)
+                changed = True
+            await asyncio.sleep(ENTITY_RESOLVE_PAUSE)
+        if changed:
+            self.save()
+        return changed
+
+    async def refresh_loop(self, client, usernames, on_change=None):
+        """Фонова перевірка кешу; on_change() — коли id/access_hash оновились."""
+        while True:
+            await asyncio.sleep(ENTITY_REFRESH_HOURS * 3600)
+            try:
+                if await self.resolve(client, usernames, refresh=True) and on_change:
+                    on_change()
+            except Exception as e:
+                print(f"❌ Помилка оновлення кешу каналів: {e}")
@@ -0,0 +1,98 @@
+# alert_sources/prefilter.py
+# Ключові слова чекера і один прекомпільований матчер для них.
+# Без Telethon — імпортується і з бенчмарків.
+from utils.filter import KEYWORD_CATEGORIES as FILTER_CATEGORIES
+from utils.keywords import KeywordMatcher
+from utils.regions import REGISTRY
+from utils.scoring import SCORER, Relevance
+
+# =========================
+# Ключі та фрази
+# =========================
+ALARM_PHRASES = [
+    "повітряна тривога", "відбій тривоги",
+    "воздушная тревога", "отбой тревоги",
+]
+
+# Загрози — ширший пул для базового префільтра
+THREAT_KEYWORDS = [
+    "шахед", "шахеди", "shahed", "шаhed", "мопед", "мопеди",
+    "дрон", "дрони", "бпла", "безпілотник", "безпілотники",
+    "ракета", "ракети", "ракетн",
+    "іскандер", "кинжал", "калібр",
+    "балістика", "балістичн",
+    "пуск", "пуски", "запуск", "запуски",
+    "зліт", "зльот", "взлёт", "взлет",
+    "авіація", "авиация",
+    "удар", "удари", "обстріл", "обстріли",
+    "обстрел", "обстрелы",
+    "вибух", "вибухи", "взрыв", "взрывы",
+    "приліт", "прильот", "прильоти", "прилет", "прилеты",
+    "сирена", "небезпека", "загроза", "опасност", "угроза",
+    # емодзі (можуть траплятися)
+    "🛵", "🚀", "💥", "✈️", "💣", "🛩️", "🎯", "🧨", "🚨", "🔥",
+]
+
+# Швидка загроза — дозволяє проходити без GEO під час тривоги
+THREAT_KEYWORDS_RAPID = [
+    # балістика / МіГ / пуски
+    "балістика", "балістичн", "баллистик",
+    "міг-31", "миг-31", "міг31", "миг31", "міг", "миг",
+    "кинжал", "искандер",
+    "пуск", "пуски", "запуск", "запуски", "старт",
+]
+
+# GEO ключі (стеми і близькі локації) — з реєстру регіонів
+REGION_KEYWORDS = REGISTRY.stems
+
+# Бонус-фрази для bro_revisor — навіть без GEO
+BRO_REVISOR_BONUS = {
+    "на нас", "не летить", "летить", "не фіксується", "дорозвідка"
+}
+
+# Грубе визначення threat_type, якщо класифікатор його не дав (порядок важливий)
+THREAT_GUESSES = [
+    ("ракета", ["ракет"]),
+    ("шахед/дрон", ["шахед", "дрон", "бпла"]),
+    ("балістика/МіГ", ["балістика", "баллистик", "миг", "міг", "кинжал", "искандер"]),
+]
+
+# Один прекомпільований матчер: категорії чекера + категорії utils/filter,
+# тож текст сканується рівно один раз
+CHECKER_CATEGORIES = {
+    "alarm_phrase": ALARM_PHRASES,
+    "threat_any": THREAT_KEYWORDS,
+    "rapid_any": THREAT_KEYWORDS_RAPID,
+    "revisor_bonus": BRO_REVISOR_BONUS,
+    **{f"guess:{label}": keys for label, keys in THREAT_GUESSES},
+}
+MATCHER = KeywordMatcher({**FILTER_CATEGORIES, **CHECKER_CATEGORIES})
+
+def passes_prefilter_when_active(hits: dict, username: str) -> bool:
+    """Під час активної тривоги пропускаємо якщо:
+       - є офіційні фрази (ALARM_PHRASES), або
+       - є ХОЧ ОДНА загроза (THREAT_KEYWORDS), або
+       - є ХОЧ ОДНА локація (REGION_KEYWORDS),
+       - або це bro_revisor з бонус-фразою.
+    """
+    if "alarm_phrase" in hits or "threat_any" in hits or "region" in hits:
+        return True
+    if username == "bro_revisor" and "revisor_bonus" in hits:
+        return True
+    return False
+
+def enrich_info(classified: dict, hits: dict, username: str, relevance: Relevance | None = None):
+    """Доповнює INFO балом релевантності, згаданими районами і threat_type."""
+    if relevance is None:
+        relevance = SCORER.score(hits, username)
+    classified["relevance"] = relevance.score
+    classified["signals"] = list(relevance.signals)
+    # які саме райони реєстру згадані (для маршрутизації по каналах)
+    classified["regions"] = [c[7:] for c in hits if c.startswith("region:")]
+
+    # Якщо класифікатор не визначив threat_type, спробуємо грубо
+    if not classified.get("threat_type"):
+        for label, _ in THREAT_GUESSES:
+            if f"guess:{label}" in hits:
+                classified["threat_type"] = label
+                break
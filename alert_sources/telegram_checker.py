@@ -1,6 +1,7 @@
 # alert_sources/telegram_checker.py
 import os
 import asyncio
+import itertools
 import time
 import json
 from pathlib import Path
@@ -12,6 +13,18 @@ from telethon.sessions import StringSession
 from dotenv import load_dotenv
 
 from utils.filter import classify_message
+from alert_sources.prefilter import (
+    MATCHER,
+    passes_prefilter_when_active,
+    enrich_info,
+)
+from alert_sources.entity_cache import EntityCache
+from utils.coalesce import CoalescingBuffer
+from utils.scoring import SCORER
+from utils.dedup import DedupStore
+from utils.send_queue import TokenBucket
+from utils.state_manager import load_state, save_state
+from utils.message_id import content_fingerprint
 from web import server  # live-статус та SSE
 
 # =========================
@@ -48,8 +61,16 @@ client = TelegramClient(
     flood_sleep_threshold=120
 )
 
-message_queue = asyncio.Queue()
-catch_up_messages = []
+# Черга з пріоритетами: офіційні alarm/all_clear обганяють info.
+# Елемент: (priority, seq, enqueued_at_monotonic, msg)
+PRIORITY_ALERT = 0
+PRIORITY_INFO = 1
+
+# Тип службового повідомлення «catch-up завершено»
+CATCH_UP_DONE = "catch_up_done"
+
+message_queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+_enqueue_seq = itertools.count()
 
 # =========================
 # Канали — шлях по абсолютному шляху
@@ -59,117 +80,82 @@ with open(CHANNELS_PATH, "r", encoding="utf-8") as f:
     monitored_channels = json.load(f)
 print(f"[CFG] Loaded {len(monitored_channels)} channels from {CHANNELS_PATH}")
 
+# username → (id, access_hash), переживає рестарти
+entity_cache = EntityCache()
+entity_cache.load(monitored_channels)
+
 # 🔒 «тривога/відбій» довіряємо тільки офіційному
 OFFICIAL_ALARM_SOURCES = {"air_alert_ua"}
 
-# Debounce на однакові тексти/репости (глобально)
-_RECENT_SIGS = set()
-_MAX_SIGS = 500
+# Debounce на однакові тексти/репости (глобально): LRU + TTL
+_recent_sigs = DedupStore(max_size=500, ttl=3600)
 
-# ⏱️ Тротлінг по каналах (окрім офіційних): не частіше ніж раз на 10 секунд
+# ⏱️ Вікно по каналах (окрім офіційних): не частіше ніж раз на 10 секунд,
+# але найважливіше повідомлення вікна не губиться, а йде наприкінці вікна
 _THROTTLE_SECONDS = 10.0
-_last_handled_at: dict[str, float] = {}  # username -> monotonic ts
+_coalescer = CoalescingBuffer(_THROTTLE_SECONDS, on_flush=lambda u, item: _flush_coalesced(u, item))
+
+# Catch-up після рестарту/розриву
+CATCHUP_MAX_AGE_MINUTES = float(os.getenv("CATCHUP_MAX_AGE_MINUTES", "30"))  # старіше — ігноруємо
+CATCHUP_PAGE = int(os.getenv("CATCHUP_PAGE", "50"))                  # повідомлень за запит
+CATCHUP_CONCURRENCY = int(os.getenv("CATCHUP_CONCURRENCY", "3"))     # каналів одночасно
+CATCHUP_RATE = float(os.getenv("CATCHUP_RATE", "2"))                 # запитів/с на всіх
+CATCHUP_BURST = float(os.getenv("CATCHUP_BURST", "5"))
+CATCHUP_MAX_REQUESTS = int(os.getenv("CATCHUP_MAX_REQUESTS", "40"))  # стеля на один прогін
+CATCHUP_MAX_FLOOD_WAIT = int(os.getenv("CATCHUP_MAX_FLOOD_WAIT", "60"))
+RECONNECT_DELAY = float(os.getenv("TG_RECONNECT_DELAY", "5"))
+
+# last_ids у спільному стані (state.json)
+_state = load_state()
+
+
+def _canonical_last_ids():
+    """Ключі last_ids — імена з channels.json. Старий кеш каналів віддавав їх
+    у нижньому регістрі, тож зливаємо такі дублі в канонічний ключ."""
+    names = {u.lower(): u for u in monitored_channels}
+    last_ids = _state.get("last_ids") or {}
+    for key in list(last_ids):
+        name = names.get(key.lower())
+        if name is not None and name != key:
+            last_ids[name] = max(last_ids.pop(key), last_ids.get(name, 0))
+
+
+_canonical_last_ids()
+
+def _remember_last_id(username: str, message_id: int):
+    """Останній побачений id по каналу — з нього почнеться наступний catch-up."""
+    last_ids = _state.setdefault("last_ids", {})
+    if message_id > last_ids.get(username, 0):
+        last_ids[username] = message_id
+        save_state(_state)  # дебаунс: зливається з іншими змінами
+
 
-# =========================
-# Ключі та фрази
-# =========================
-ALARM_PHRASES = [
-    "повітряна тривога", "відбій тривоги",
-    "воздушная тревога", "отбой тревоги",
-]
-
-# Загрози — ширший пул для базового префільтра
-THREAT_KEYWORDS = [
-    "шахед", "шахеди", "shahed", "шаhed", "мопед", "мопеди",
-    "дрон", "дрони", "бпла", "безпілотник", "безпілотники",
-    "ракета", "ракети", "ракетн",
-    "іскандер", "кинжал", "калібр",
-    "балістика", "балістичн",
-    "пуск", "пуски", "запуск", "запуски",
-    "зліт", "зльот", "взлёт", "взлет",
-    "авіація", "авиация",
-    "удар", "удари", "обстріл", "обстріли",
-    "обстрел", "обстрелы",
-    "вибух", "вибухи", "взрыв", "взрывы",
-    "приліт", "прильот", "прильоти", "прилет", "прилеты",
-    "сирена", "небезпека", "загроза", "опасност", "угроза",
-    # емодзі (можуть траплятися)
-    "🛵", "🚀", "💥", "✈️", "💣", "🛩️", "🎯", "🧨", "🚨", "🔥",
-]
-
-# Швидка загроза — дозволяє проходити без GEO під час тривоги
-THREAT_KEYWORDS_RAPID = [
-    # балістика / МіГ / пуски
-    "балістика", "балістичн", "баллистик",
-    "міг-31", "миг-31", "міг31", "миг31", "міг", "миг",
-    "кинжал", "искандер",
-    "пуск", "пуски", "запуск", "запуски", "старт",
-]
-
-# GEO ключі (стеми і близькі локації)
-REGION_KEYWORDS = [
-    # Бровари/район (включаючи 'бровари', 'броварськ' тощо)
-    "бровар", "бровари", "броварськ",
-    # Область / Київ / Київщина
-    "київська область", "київщина", "київ",
-    # Околиці (стемінг)
-    "княжич", "требух", "калинівк", "велика димер", "мала димер",
-    "богданівк", "красилівк", "погреб", "зазим", "літк", "пухівк",
-    "рожн", "світильн", "семиполк", "квітнев", "перемог", "гогол", "калит",
-    # Ближні локації
-    "бориспіл", "троєщин", "лісов", "дарниц", "вишгород", "обух",
-    "ірпін", "буча", "гостомел", "вишнев", "васильк", "березан", "баришівк",
-    # RU-варианти базових назв (мінімально)
-    "киев", "киевская область", "броварск", "бровары",
-]
-
-# Бонус-фрази для bro_revisor — навіть без GEO
-BRO_REVISOR_BONUS = {
-    "на нас", "не летить", "летить", "не фіксується", "дорозвідка"
-}
-
-def _contains_any(lower: str, keys: list[str] | set[str]) -> bool:
-    return any(k in lower for k in keys)
-
-def _passes_prefilter_when_active(lower: str, username: str) -> bool:
-    """Під час активної тривоги пропускаємо якщо:
-       - є офіційні фрази (ALARM_PHRASES), або
-       - є ХОЧ ОДНА загроза (THREAT_KEYWORDS), або
-       - є ХОЧ ОДНА локація (REGION_KEYWORDS),
-       - або це bro_revisor з бонус-фразою.
-    """
-    if _contains_any(lower, ALARM_PHRASES):
-        return True
-    if _contains_any(lower, THREAT_KEYWORDS):
-        return True
-    if _contains_any(lower, REGION_KEYWORDS):
-        return True
-    if username == "bro_revisor" and _contains_any(lower, BRO_REVISOR_BONUS):
-        return True
-    return False
-
-def _derive_flags(lower: str, username: str) -> tuple[bool, bool, bool]:
-    """Повертає (region_hit, rapid_hit, revisor_bonus) для INFO."""
-    region_hit = _contains_any(lower, REGION_KEYWORDS)
-    rapid_hit = _contains_any(lower, THREAT_KEYWORDS_RAPID)
-    revisor_bonus = False
-
-    # Бонуси для bro_revisor: короткі фрази типу «на нас», «летить» і т.д.
-    if username == "bro_revisor" and _contains_any(lower, BRO_REVISOR_BONUS):
-        region_hit = True  # поводимось як з локальною гео-важливістю
-        revisor_bonus = True
-
-    return region_hit, rapid_hit, revisor_bonus
-
-@client.on(events.NewMessage(chats=monitored_channels))
 async def handle_all_messages(event):
-    username = getattr(event.chat, 'username', None)
+    # канал за числовим peer id з кешу — без event.chat і мережевих запитів
+    username = entity_cache.username_for(event.chat_id)
     if not username:
         return
+    await process_message(username, event.message)
+
+
+_handler_filter: events.NewMessage | None = None
+
+
+def _register_handler():
+    """(Пере)реєструє обробник на InputPeerChannel з кешу."""
+    global _handler_filter
+    if _handler_filter is not None:
+        client.remove_event_handler(handle_all_messages, _handler_filter)
+    _handler_filter = events.NewMessage(chats=entity_cache.peers(monitored_channels))
+    client.add_event_handler(handle_all_messages, _handler_filter)
+
+
+async def process_message(username: str, message, live: bool = True, hits: dict | None = None, relevance=None):
+    """Спільна обробка для живих подій і catch-up (live=False — без вікна каналу).
+    hits/relevance — якщо викликач уже порахував їх пакетом."""
+    _remember_last_id(username, message.id)
 
-    text = event.message.text or ""
-    lower = text.lower()
-    url = f"https://t.me/{username}/{event.message.id}"
+    lower = (message.text or "").lower()
 
     alert_active = bool(server.status.get("alert_active"))
 
@@ -177,27 +163,46 @@ async def handle_all_messages(event):
     if username not in OFFICIAL_ALARM_SOURCES and not alert_active:
         return
 
-    # Тротлінг/префільтр для неофіційних під час активної тривоги
+    # Один прохід по тексту: усі категорії ключів для префільтра, фільтра і оцінки
+    if hits is None:
+        hits = MATCHER.scan(lower)
+
+    # Префільтр і вікно каналу для неофіційних під час активної тривоги
     if username not in OFFICIAL_ALARM_SOURCES:
-        now = time.monotonic()
-        last = _last_handled_at.get(username, 0.0)
-        if (now - last) < _THROTTLE_SECONDS:
+        if not passes_prefilter_when_active(hits, username):
             return
-        _last_handled_at[username] = now
+        if live:
+            # у вікні _THROTTLE_SECONDS: одне найважливіше — наприкінці вікна
+            if relevance is None:
+                relevance = SCORER.score(hits, username)
+            ready = _coalescer.offer(username, relevance.score, (message, hits, relevance))
+            server.status["coalesce"] = _coalescer.stats()
+            if not ready:
+                return
 
-        if not _passes_prefilter_when_active(lower, username):
-            return
+    await _deliver(username, message, hits, live, relevance)
+
+
+async def _flush_coalesced(username: str, item):
+    message, hits, relevance = item
+    server.status["coalesce"] = _coalescer.stats()
+    await _deliver(username, message, hits, live=True, relevance=relevance)
+
+
+async def _deliver(username: str, message, hits: dict, live: bool, relevance=None):
+    """Дедуплікація, класифікація і постановка в чергу диспетчера."""
+    text = message.text or ""
+    url = f"https://t.me/{username}/{message.id}"
 
     # Debounce на однакові тексти/репости
-    sig = hash((username, text))
-    if sig in _RECENT_SIGS:
+    sig = content_fingerprint(username, text)
+    duplicate = _recent_sigs.check_and_add(sig)
+    server.status["dedup"]["reposts"] = _recent_sigs.stats()
+    if duplicate:
         return
-    _RECENT_SIGS.add(sig)
-    if len(_RECENT_SIGS) > _MAX_SIGS:
-        _RECENT_SIGS.pop()
 
     # Класифікація (додаємо source для прозорості)
-    classified = classify_message(text, url, source=username)
+    classified = classify_message(text, url, source=username, hits=hits)
     if not classified:
         print(f"[TELEGRAM CHECKER] @{username} → None")
         return
@@ -206,36 +211,22 @@ async def handle_all_messages(event):
     if classified["type"] in ("alarm", "all_clear") and username not in OFFICIAL_ALARM_SOURCES:
         classified["type"] = "info"
 
-    # Доповнюємо INFO прапорцями region_hit / rapid_hit / revisor_bonus
     if classified["type"] == "info":
-        region_hit, rapid_hit, revisor_bonus = _derive_flags(lower, username)
-        classified["region_hit"] = region_hit
-        classified["rapid_hit"]  = rapid_hit
-        if revisor_bonus:
-            classified["revisor_bonus"] = True
-
-        # Якщо класифікатор не визначив threat_type, спробуємо грубо
-        if not classified.get("threat_type"):
-            if "ракета" in lower or "ракет" in lower:
-                classified["threat_type"] = "ракета"
-            elif "шахед" in lower or "дрон" in lower or "бпла" in lower:
-                classified["threat_type"] = "шахед/дрон"
-            elif _contains_any(lower, ["балістика", "баллистик", "миг", "міг", "кинжал", "искандер"]):
-                classified["threat_type"] = "балістика/МіГ"
+        enrich_info(classified, hits, username, relevance)
+    if not live:
+        classified["catch_up"] = True
 
     # оновлюємо веб-статус (короткий буфер)
-    server.status["last_messages"].append({
+    server.add_message({
         "text": text,
         "username": username,
         "url": url,
-        "date": event.message.date.isoformat(),
+        "date": message.date.isoformat(),
     })
-    if len(server.status["last_messages"]) > 50:
-        server.status["last_messages"] = server.status["last_messages"][-50:]
 
     # у чергу для основного циклу
-    classified["date"] = event.message.date.replace(tzinfo=timezone.utc)
-    await message_queue.put(classified)
+    classified["date"] = message.date.replace(tzinfo=timezone.utc)
+    enqueue_message(classified)
 
     print(f"[TELEGRAM CHECKER] @{username} → {classified}")
     # Live-оновлення
@@ -243,60 +234,151 @@ async def handle_all_messages(event):
 
 async def start_monitoring():
     await client.start()
-    await client.run_until_disconnected()
-
-async def check_telegram_channels():
-    if not message_queue.empty():
-        return await message_queue.get()
-    return None
-
-# ⚠️ catch-up краще НЕ ВИКЛИКАТИ з main.py (зайві API-запити)
-async def fetch_last_messages(minutes: int):
-    if not await client.is_user_authorized():
-        print("❗ Не авторизовано для підвантаження повідомлень.")
-        return
-
-    monitor_start_time = datetime.now(timezone.utc) - timedelta(minutes=minutes)
-    print(f"🔄 Підвантаження повідомлень з {monitor_start_time.isoformat()}")
-
-    for username in monitored_channels:
+    # межа catch-up — до живого обробника: живий пост не має зсунути last_ids
+    # за ще не догнаний розрив
+    last_ids = dict(_state.get("last_ids", {}))
+    # обробник — одразу на канали з кешу (офіційний не чекає ResolveUsername
+    # нових каналів і їхніх FloodWait); нові з channels.json дотягуються у фоні
+    _register_handler()
+    resolve_task = asyncio.create_task(_resolve_missing())
+    refresh_task = asyncio.create_task(
+        entity_cache.refresh_loop(client, monitored_channels, on_change=_register_handler)
+    )
+    # пропущене, поки бот не працював
+    catch_up_task = asyncio.create_task(catch_up(last_ids))
+    while True:
+        await client.run_until_disconnected()
+        # Telethon вичерпав власні перепідключення — пробуємо самі і доганяємо розрив
+        print(f"[TG] З'єднання втрачено, перепідключення через {RECONNECT_DELAY:.0f} с")
+        await asyncio.sleep(RECONNECT_DELAY)
+        last_ids = dict(_state.get("last_ids", {}))  # до connect(): далі йдуть живі події
         try:
-            entity = await client.get_entity(username)
+            await client.connect()
+        except (OSError, ConnectionError) as e:
+            print(f"❌ Не вдалося перепідключитись: {e}")
+            continue
+        if catch_up_task.done():
+            catch_up_task = asyncio.create_task(catch_up(last_ids))
+
+async def _resolve_missing():
+    """Канали з channels.json, яких ще нема в кеші; після — перереєстрація обробника."""
+    try:
+        if await entity_cache.resolve(client, monitored_channels):
+            _register_handler()
+    except Exception as e:
+        print(f"❌ Помилка пошуку нових каналів: {e}")
+
+def enqueue_message(msg: dict):
+    """Кладе повідомлення в чергу диспетчера; alarm/all_clear — з вищим пріоритетом.
+    Маркер CATCH_UP_DONE — теж: він іде одразу за пропущеними alarm/all_clear."""
+    priority = PRIORITY_ALERT if msg.get("type") in ("alarm", "all_clear", CATCH_UP_DONE) else PRIORITY_INFO
+    message_queue.put_nowait((priority, next(_enqueue_seq), time.monotonic(), msg))
+
+async def next_message() -> dict:
+    """Чекає наступне повідомлення (без пулінгу) і проставляє затримку черги."""
+    _, _, enqueued_at, msg = await message_queue.get()
+    msg["dispatch_latency_ms"] = round((time.monotonic() - enqueued_at) * 1000, 3)
+    return msg
+
+# =========================
+# Catch-up: лише нові id, канали паралельно, спільний бюджет запитів
+# =========================
+class _CatchUpBudget:
+    """Спільний для всіх каналів ліміт: token bucket + стеля запитів на прогін.
+    FloodWait блокує всіх одразу, а не лише канал, що його отримав."""
+
+    def __init__(self, max_requests: int):
+        self.bucket = TokenBucket(CATCHUP_RATE, CATCHUP_BURST)
+        self.left = max_requests
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> bool:
+        async with self._lock:
+            if self.left <= 0:
+                return False
+            while (delay := self.bucket.delay(time.monotonic())) > 0:
+                await asyncio.sleep(delay)
+            self.bucket.consume()
+            self.left -= 1
+            return True
+
+    def flood(self, seconds: float):
+        self.bucket.block(seconds)
+
+
+async def _catch_up_channel(username: str, last_id: int, budget: _CatchUpBudget, since: datetime,
+                            gate: asyncio.Semaphore) -> list:
+    first_run = not last_id
+    fetched = []
+    async with gate:
+        # кеш каналів, без ResolveUsername
+        entity = entity_cache.input_peer(username) or await client.get_input_entity(username)
+        while await budget.acquire():
             try:
-                messages = await client.get_messages(entity, limit=50)
+                if first_run:
+                    # перший запуск (нема last_ids): лише запам'ятовуємо останній id —
+                    # що було до нас, могло вже бути розіслане попереднім процесом
+                    page = await client.get_messages(entity, limit=1)
+                else:
+                    # від старіших до новіших, лише id > last_id
+                    page = await client.get_messages(entity, limit=CATCHUP_PAGE, min_id=last_id, reverse=True)
             except FloodWaitError as e:
-                print(f"⏳ Flood wait {e.seconds}s на {username}")
-                await asyncio.sleep(e.seconds)
+                if e.seconds > CATCHUP_MAX_FLOOD_WAIT:
+                    print(f"⏳ Flood wait {e.seconds}s на {username} — catch-up каналу зупинено")
+                    break
+                print(f"⏳ Flood wait {e.seconds}s на {username} — пауза для всіх каналів")
+                budget.flood(e.seconds)
                 continue
-
-            for msg in reversed(messages):
-                if msg.date.replace(tzinfo=timezone.utc) >= monitor_start_time:
-                    cl = classify_message(msg.text or "", f"https://t.me/{username}/{msg.id}", source=username)
-                    if cl:
-                        if cl["type"] in ("alarm", "all_clear") and username not in OFFICIAL_ALARM_SOURCES:
-                            cl["type"] = "info"
-
-                        lower = (msg.text or "").lower()
-                        if cl["type"] == "info":
-                            region_hit, rapid_hit, revisor_bonus = _derive_flags(lower, username)
-                            cl["region_hit"] = region_hit
-                            cl["rapid_hit"] = rapid_hit
-                            if revisor_bonus:
-                                cl["revisor_bonus"] = True
-
-                            if not cl.get("threat_type"):
-                                if "ракета" in lower or "ракет" in lower:
-                                    cl["threat_type"] = "ракета"
-                                elif "шахед" in lower or "дрон" in lower or "бпла" in lower:
-                                    cl["threat_type"] = "шахед/дрон"
-                                elif _contains_any(lower, ["балістика", "баллистик", "миг", "міг", "кинжал", "искандер"]):
-                                    cl["threat_type"] = "балістика/МіГ"
-
-                        cl["date"] = msg.date.replace(tzinfo=timezone.utc)
-                        catch_up_messages.append(cl)
-            await asyncio.sleep(0.3)
-        except Exception as e:
-            print(f"❌ Помилка підвантаження повідомлень з {username}: {e}")
-
-async def get_catch_up_messages():
-    return catch_up_messages
+            if not page:
+                break
+            if first_run:
+                _remember_last_id(username, page[0].id)
+                break
+            fetched.extend(m for m in page if m.date.replace(tzinfo=timezone.utc) >= since)
+            last_id = max(last_id, page[-1].id)
+            _remember_last_id(username, last_id)
+            if len(page) < CATCHUP_PAGE:
+                break
+    return [(username, m) for m in fetched]
+
+
+async def catch_up(last_ids: dict | None = None, max_age_minutes: float | None = None):
+    """Доганяє повідомлення, пропущені під час простою/розриву з'єднання.
+
+    last_ids — знімок на момент до (пере)підключення обробника; без нього
+    береться поточний стан.
+    """
+    if last_ids is None:
+        last_ids = dict(_state.get("last_ids", {}))
+    if not await client.is_user_authorized():
+        print("❗ Не авторизовано для підвантаження повідомлень.")
+        return
+    started = time.monotonic()
+    since = datetime.now(timezone.utc) - timedelta(minutes=max_age_minutes or CATCHUP_MAX_AGE_MINUTES)
+    budget = _CatchUpBudget(CATCHUP_MAX_REQUESTS)
+    gate = asyncio.Semaphore(CATCHUP_CONCURRENCY)
+
+    results = await asyncio.gather(
+        *(_catch_up_channel(u, last_ids.get(u, 0), budget, since, gate) for u in monitored_channels),
+        return_exceptions=True,
+    )
+    missed = []
+    for username, result in zip(monitored_channels, results):
+        if isinstance(result, Exception):
+            print(f"❌ Помилка підвантаження повідомлень з {username}: {result}")
+        else:
+            missed.extend(result)
+
+    # у хронологічному порядку по всіх каналах
+    missed.sort(key=lambda item: item[1].date)
+    # скан і оцінка — одним пакетом для всього пропущеного
+    batch_hits = [MATCHER.scan((m.text or "").lower()) for _, m in missed]
+    scores = SCORER.score_many(zip(batch_hits, (u for u, _ in missed)))
+    for (username, message), hits, relevance in zip(missed, batch_hits, scores):
+        await process_message(username, message, live=False, hits=hits, relevance=relevance)
+    # маркер кінця catch-up: диспетчер зводить пропущені тривоги в одне зведення
+    enqueue_message({"type": CATCH_UP_DONE})
+    print(
+        f"[CATCHUP] {len(missed)} повідомлень за {time.monotonic() - started:.1f} с, "
+        f"запитів: {CATCHUP_MAX_REQUESTS - budget.left}"
+    )
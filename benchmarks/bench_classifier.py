@@ -0,0 +1,76 @@
+# benchmarks/bench_classifier.py
+# alert_sources/classifier.classify_message: регекси, що будуються в циклах на
+# кожен виклик (як було), проти правил, скомпільованих при імпорті.
+# Перевіряє, що результати однакові на корпусі benchmarks/channel_posts.json.
+#
+#   python -m benchmarks.bench_classifier [повторів]
+import os
+import re
+import sys
+import json
+import time
+
+from alert_sources import classifier
+from utils.message_id import make_message_id
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "channel_posts.json")
+
+
+def _legacy_district(lower):
+    if any(re.search(rf"\b{w}\b", lower) for w in classifier.BROVARY_KEYWORDS):
+        return "Броварський район"
+    if any(re.search(rf"\b{w}\b", lower) for w in classifier.KYIVREGION_KEYWORDS):
+        return "Київська область"
+    return None
+
+
+def legacy_classify(text, source_url):
+    if not text:
+        return None
+    lower = text.lower()
+    district = _legacy_district(lower)
+    base = {"district": district, "text": text, "url": source_url,
+            "id": make_message_id(text=text, url=source_url)}
+    for pattern in classifier.ALL_CLEAR_PATTERNS:
+        if re.search(pattern, lower) and district is not None:
+            return {**base, "type": "all_clear"}
+    if "повітряна тривога" in lower and district is not None:
+        return {**base, "type": "alarm"}
+    for threat in classifier.GLOBAL_THREATS:
+        if re.search(rf"\b{threat}\w*\b", lower):
+            return {**base, "type": "alarm", "threat_type": threat}
+    for threat in classifier.LOCAL_THREATS:
+        if re.search(rf"\b{threat}\w*\b", lower):
+            if district:
+                return {**base, "type": "alarm", "threat_type": threat}
+            return None
+    if district:
+        return {**base, "type": "info"}
+    return None
+
+
+def _bench(fn, posts, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for text, url in posts:
+            fn(text, url)
+    return len(posts) * rounds / (time.perf_counter() - t0)
+
+
+def main(rounds: int):
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        posts = [(p["text"], f"https://t.me/{p['source']}/{i}") for i, p in enumerate(json.load(f))]
+
+    mismatches = [p for p in posts if legacy_classify(*p) != classifier.classify_message(*p)]
+    print(f"корпус: {len(posts)} постів, розбіжностей: {len(mismatches)}")
+    for text, url in mismatches:
+        print(f"  {url}: {text[:80]!r}")
+
+    before = _bench(legacy_classify, posts, rounds)
+    after = _bench(classifier.classify_message, posts, rounds)
+    print(f"регекси в циклах     : {before:10.0f} повідомлень/с")
+    print(f"скомпільовані правила: {after:10.0f} повідомлень/с  (x{after / before:.2f})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,75 @@
+# benchmarks/bench_keywords.py
+# Префільтр чекера + прапорці utils/filter: послідовні `k in lower` по кожному
+# списку (як було) проти одного проходу KeywordMatcher. Корпус —
+# benchmarks/channel_posts.json (типові пости моніторених каналів).
+#
+#   python -m benchmarks.bench_keywords [повторів]
+import os
+import sys
+import json
+import time
+
+import alert_sources.prefilter as tg
+import utils.filter as flt
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "channel_posts.json")
+
+
+def _contains_any(lower, keys):
+    return any(k in lower for k in keys)
+
+
+def legacy_scan(lower: str, username: str):
+    prefilter = (
+        _contains_any(lower, tg.ALARM_PHRASES)
+        or _contains_any(lower, tg.THREAT_KEYWORDS)
+        or _contains_any(lower, tg.REGION_KEYWORDS)
+        or (username == "bro_revisor" and _contains_any(lower, tg.BRO_REVISOR_BONUS))
+    )
+    region = _contains_any(lower, tg.REGION_KEYWORDS)
+    rapid = _contains_any(lower, tg.THREAT_KEYWORDS_RAPID)
+    bonus = username == "bro_revisor" and _contains_any(lower, tg.BRO_REVISOR_BONUS)
+    guess = next((label for label, keys in tg.THREAT_GUESSES if _contains_any(lower, keys)), None)
+    f_region = _contains_any(lower, flt.REGION_KEYWORDS)
+    f_rapid = _contains_any(lower, flt.RAPID_THREATS)
+    f_threat = next((w for w in flt.THREAT_WORDS if w in lower), None)
+    return prefilter, region or bonus, rapid, bonus, guess, f_region, f_rapid, f_threat
+
+
+def matcher_scan(lower: str, username: str):
+    hits = tg.MATCHER.scan(lower)
+    prefilter = tg.passes_prefilter_when_active(hits, username)
+    region = "region" in hits or (username == "bro_revisor" and "revisor_bonus" in hits)
+    rapid = "rapid_any" in hits
+    bonus = username == "bro_revisor" and "revisor_bonus" in hits
+    guess = next((label for label, _ in tg.THREAT_GUESSES if f"guess:{label}" in hits), None)
+    return (prefilter, region, rapid, bonus, guess,
+            "region" in hits, "rapid" in hits, flt._guess_threat(hits))
+
+
+def _bench(fn, posts, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for lower, username in posts:
+            fn(lower, username)
+    elapsed = time.perf_counter() - t0
+    return len(posts) * rounds / elapsed
+
+
+def main(rounds: int):
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        posts = [(p["text"].lower(), p["source"]) for p in json.load(f)]
+
+    mismatches = [p for p in posts if legacy_scan(*p) != matcher_scan(*p)]
+    print(f"корпус: {len(posts)} постів, розбіжностей: {len(mismatches)}")
+    for lower, username in mismatches:
+        print(f"  @{username}: {lower[:80]!r}")
+
+    before = _bench(legacy_scan, posts, rounds)
+    after = _bench(matcher_scan, posts, rounds)
+    print(f"k in lower по списках : {before:10.0f} постів/с")
+    print(f"KeywordMatcher (1 прохід): {after:10.0f} постів/с  (x{after / before:.2f})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,77 @@
+# benchmarks/bench_sender.py
+# Затримка одного sendMessage: нова ClientSession на кожне повідомлення (як було)
+# проти спільного BotApiClient з keep-alive пулом. Працює проти локальної
+# aiohttp-заглушки Bot API, тож мережа/TLS не враховуються — реальний виграш
+# до api.telegram.org більший.
+#
+#   python -m benchmarks.bench_sender [кількість_повідомлень]
+import sys
+import time
+import asyncio
+import statistics
+
+import aiohttp
+from aiohttp import web
+
+from utils.sender import BotApiClient
+
+TOKEN = "bench"
+
+
+async def _stub_send_message(request: web.Request):
+    await request.post()
+    return web.json_response({"ok": True, "result": {"message_id": 1}})
+
+
+async def _start_stub():
+    app = web.Application()
+    app.router.add_post(f"/bot{TOKEN}/sendMessage", _stub_send_message)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def _send_fresh_session(base_url: str, data: dict):
+    # стара реалізація utils/sender.send_alert_message
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{base_url}/bot{TOKEN}/sendMessage", data=data, timeout=10) as response:
+            return (await response.json())["result"]["message_id"]
+
+
+def _report(name: str, samples: list[float]):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:<22} mean={statistics.mean(samples):7.3f} ms  "
+          f"p50={statistics.median(samples):7.3f} ms  p95={p95:7.3f} ms")
+
+
+async def main(n: int):
+    runner, base_url = await _start_stub()
+    data = {"chat_id": "1", "text": "🚨 Повітряна тривога — Броварський район!", "disable_notification": "false"}
+
+    before = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await _send_fresh_session(base_url, data)
+        before.append((time.perf_counter() - t0) * 1000)
+
+    client = BotApiClient(TOKEN, base_url)
+    await client.start()
+    after = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await client.call("sendMessage", data)
+        after.append((time.perf_counter() - t0) * 1000)
+    await client.close()
+    await runner.cleanup()
+
+    print(f"{n} повідомлень проти {base_url}")
+    _report("session per message", before)
+    _report("pooled BotApiClient", after)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
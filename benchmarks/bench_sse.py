@@ -0,0 +1,91 @@
+# benchmarks/bench_sse.py
+# Розсилка SSE на багато підписників: рядок під глобальним локом + encode у
+# кожного підписника і необмежені asyncio.Queue (як було) проти одного
+# encode у bytes і обмежених черг web/server. Підписники — in-process
+# споживачі без HTTP, один із них «завис» (не читає). Одне повідомлення
+# бота дає кілька подій поспіль (message, log, status) — шлемо їх пачками.
+#
+#   python -m benchmarks.bench_sse [підписників] [подій]
+import sys
+import json
+import time
+import asyncio
+
+from web import server
+
+BURST = 3
+SNAPSHOT = {"text": "Повітряна тривога в Броварський район " * 4, "url": "https://t.me/air_alert_ua/1"}
+
+
+async def _legacy(subscribers: int, events: int):
+    lock = asyncio.Lock()
+    queues = [asyncio.Queue() for _ in range(subscribers)]
+    encoded = 0
+
+    async def consume(q):
+        nonlocal encoded
+        while True:
+            payload = await q.get()
+            encoded += len(payload.encode("utf-8"))  # один write на подію
+
+    # останній підписник «завис»
+    tasks = [asyncio.create_task(consume(q)) for q in queues[:-1]]
+    t0 = time.perf_counter()
+    for i in range(events):
+        payload = f"data: {json.dumps(SNAPSHOT, ensure_ascii=False)}\n\n"
+        async with lock:
+            for q in queues:
+                q.put_nowait(payload)
+        if i % BURST == BURST - 1:
+            await asyncio.sleep(0)
+    while any(not q.empty() for q in queues[:-1]):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - t0
+    for t in tasks:
+        t.cancel()
+    return elapsed, encoded, queues[-1].qsize()
+
+
+async def _current(subscribers: int, events: int):
+    subs = [server._Subscriber() for _ in range(subscribers)]
+    server._subscribers.update(subs)
+    written = 0
+
+    async def consume(sub):
+        nonlocal written
+        while True:
+            if not sub.queue:
+                sub.wakeup.clear()
+                await sub.wakeup.wait()
+                continue
+            written += len(b"".join(p for _, p in sub.queue))  # один write на пачку
+            sub.queue.clear()
+
+    tasks = [asyncio.create_task(consume(s)) for s in subs[:-1]]
+    t0 = time.perf_counter()
+    for i in range(events):
+        server._emit("message", SNAPSHOT)
+        if i % BURST == BURST - 1:
+            await asyncio.sleep(0)
+    while any(s.queue for s in subs[:-1]):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - t0
+    for t in tasks:
+        t.cancel()
+    server._subscribers.clear()
+    return elapsed, written, len(subs[-1].queue)
+
+
+async def main(subscribers: int, events: int):
+    before, _, stuck_before = await _legacy(subscribers, events)
+    after, _, stuck_after = await _current(subscribers, events)
+    print(f"{subscribers} підписників, {events} подій")
+    print(f"str + encode у кожного, лок : {events / before:8.0f} подій/с, черга завислого: {stuck_before}")
+    print(f"bytes один раз, без локу    : {events / after:8.0f} подій/с, черга завислого: {stuck_after}"
+          f"  (x{before / after:.2f})")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    asyncio.run(main(n, m))
@@ -1,5 +1,6 @@
 # main.py
 import os
+import time
 import asyncio
 from datetime import datetime
 from dotenv import load_dotenv
@@ -10,147 +11,399 @@ from utils.sender import (
     send_alert_with_screenshot,
     send_start_message,
     edit_message,
+    start_sender,
+    close_sender,
 )
-from utils.screenshot import take_alert_screenshot
-from utils.state_manager import load_state, save_state
+from utils.send_queue import PRIORITY_ALERT, PRIORITY_INFO
+from utils.digest import InfoDigest, DIGEST_ENABLED
+from utils.dedup import DedupStore
+from utils.journal import journal
+from utils.scoring import SCORER
+from utils.alert_state import AlertBoard, format_duration
+from utils.regions import REGISTRY
+from utils.screenshot import (
+    take_alert_screenshot,
+    start_screenshot_worker,
+    stop_screenshot_worker,
+)
+from utils.state_manager import load_state, save_state, flush_state
 from web import server
 
 load_dotenv()
 
-# Два дозволені регіони
-ALLOWED_DISTRICTS = {"броварський район", "київська область"}
+# Пам'ять уже пересланих INFO: не більше N записів, кожен живе TTL секунд
+THREAT_SENT_MAX = int(os.getenv("THREAT_SENT_MAX", "2000"))
+THREAT_SENT_TTL = float(os.getenv("THREAT_SENT_TTL", str(6 * 3600)))
+
+# «Швидкий шлях» тривоги: текст одразу, карта — відповіддю, коли буде готова
+ALARM_FAST_PATH = os.getenv("ALARM_FAST_PATH", "1") != "0"
+
+# Без свіжого знімка state.json — скільки годин журналу програвати на старті
+JOURNAL_REPLAY_HOURS = float(os.getenv("JOURNAL_REPLAY_HOURS", "24"))
+
+# посилання на фонові задачі, щоб їх не прибрав GC
+_background_tasks: set[asyncio.Task] = set()
+
+
+def spawn_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def attach_alert_screenshot(shot: asyncio.Task, alert_message_id, alert_text: str, chat_id: int):
+    """Дочікується карти (знімається паралельно з розсилкою) і додає її відповіддю на алерт.
+    Якщо сам текстовий алерт не пішов — шле карту з повним текстом алерту."""
+    screenshot_path = await shot
+    if not screenshot_path:
+        return
+    if alert_message_id:
+        await send_alert_with_screenshot(
+            "🗺 Карта тривог",
+            screenshot_path,
+            chat_id=chat_id,
+            reply_to_message_id=alert_message_id,
+            notify=False,
+        )
+    else:
+        await send_alert_with_screenshot(
+            alert_text, screenshot_path, chat_id=chat_id, priority=PRIORITY_ALERT
+        )
+
+
+def update_alert_status(board: AlertBoard, state: dict, server_status: dict):
+    board.to_state(state, title=REGISTRY.title)
+    state["journal_seq"] = journal.seq
+    server_status["alert_regions"] = board.stats()
+    server_status["alert_active"] = board.any_active
+    server_status["active_regions"] = [REGISTRY.title(d) for d in board.active_districts()]
+    save_state(state, immediate=True)  # переходи тривоги — одразу на диск
+    server.publish_status(immediate=True)  # і одразу на дашборди, поза лімітом кадрів
+    print(f"[STATUS] активні райони: {server_status['active_regions'] or '—'}")
+
+
+def replay_journal(board: AlertBoard, threat_sent: DedupStore, state: dict) -> int:
+    """Доганяє стан у пам'яті записами журналу, новішими за знімок state.json.
+
+    Без знімка (state["journal_seq"] нема) — програє останні JOURNAL_REPLAY_HOURS.
+    """
+    after_seq = state.get("journal_seq") or 0
+    since = None if after_seq else time.time() - JOURNAL_REPLAY_HOURS * 3600
+    replayed = 0
+    for record in journal.read(since=since, after_seq=after_seq):
+        kind = record.get("kind")
+        # "at" — час самого поста (catch-up), інакше час запису
+        if kind == "alarm":
+            if not board.any_active:
+                threat_sent.clear()
+            region = board.start(record["district"], trigger_id=record.get("id"), now=record.get("at") or record["ts"])
+            if region is not None:
+                # тривогу з catch-up ще не розсилали (див. announce_missed)
+                region.announced = not record.get("catch_up")
+        elif kind == "all_clear":
+            region = board.clear(record["district"], now=record.get("at") or record["ts"])
+            if region is not None:
+                region.announced = False
+        elif kind == "announce":
+            region = board.regions.get(record["district"])
+            if region is not None and region.active:
+                region.announced = True
+        elif kind == "forward":
+            threat_sent.add(record["id"])
+        replayed += 1
+    return replayed
+
+
+def add_log(line: str):
+    server.add_log(line)
+
+
+async def alarm_to_chat(shot: asyncio.Task, alert_text: str, chat_id: int):
+    """Текст тривоги в один чат, потім — карта відповіддю на нього."""
+    # Markdown тут безпечний (текст контрольований)
+    alert_message_id = await send_alert_message(
+        alert_text, notify=True, chat_id=chat_id, parse_mode="Markdown",
+        priority=PRIORITY_ALERT,
+    )
+    await attach_alert_screenshot(shot, alert_message_id, alert_text, chat_id)
+
+
+async def alarm_with_map(alert_text: str, chats: tuple):
+    """Без швидкого шляху: спершу скріншот, потім фото з текстом у кожен чат."""
+    screenshot_path = await take_alert_screenshot()
+    for chat in chats:
+        if screenshot_path:
+            spawn_background(send_alert_with_screenshot(
+                alert_text, screenshot_path, chat_id=chat, priority=PRIORITY_ALERT,
+            ))
+        else:
+            spawn_background(send_alert_message(
+                alert_text, notify=True, chat_id=chat, parse_mode="Markdown",
+                priority=PRIORITY_ALERT,
+            ))
+
+
+def send_alarm(alert_text: str, chats: tuple):
+    """Тривога в усі чати району; один скріншот на всіх.
+
+    Нічого не чекає: відправка (черга з лімітами, retry_after) і карта йдуть
+    фоновими задачами, тож диспетчер одразу бере наступну тривогу/відбій.
+    """
+    if not ALARM_FAST_PATH:
+        spawn_background(alarm_with_map(alert_text, chats))
+        return
+    shot = spawn_background(take_alert_screenshot())
+    for chat in chats:
+        spawn_background(alarm_to_chat(shot, alert_text, chat))
+
+
+def alarm_text(district_title: str, threat=None, source_url: str = "") -> str:
+    return (
+        f"🚨 Повітряна тривога — {district_title}!\n"
+        + (f"• Можлива загроза: {threat}\n" if threat else "")
+        + (f"• Джерело: {source_url}\n" if source_url else "")
+        + "Будьте в укриттях."
+    )
 
 
-def update_alert_status(active: bool, state: dict, server_status: dict):
-    state["alert_active"] = active
-    server_status["alert_active"] = active
-    save_state(state)
-    print(f"[STATUS] alert_active встановлено у {active}")
+def announce_missed(board: AlertBoard, routes: dict, texts: dict) -> list:
+    """Після catch-up: тривоги, що досі тривають, але їх жоден процес не розсилав
+    (за журналом/state.json — region.announced), ідуть у чати як звичайні, зі звуком.
+    texts — district → текст тривоги з пропущеного поста. Повертає розіслані райони."""
+    announced = []
+    for district in board.active_districts():
+        region = board.regions[district]
+        if region.announced:
+            continue
+        title = REGISTRY.title(district)
+        send_alarm(texts.get(district) or alarm_text(title), routes[district])
+        region.announced = True
+        journal.append("announce", district=district, id=region.trigger_id)
+        add_log(f"Тривога у {title} (почалась, поки бот був офлайн)")
+        announced.append(district)
+    return announced
+
+
+def report_missed(missed: dict, board: AlertBoard, routes: dict):
+    """Одне беззвучне зведення на чат про тривоги/відбої, що сталися й минули,
+    поки бот був офлайн (catch-up): без повторної «🚨 … Будьте в укриттях»."""
+    by_chat: dict = {}
+    for district, events in missed.items():
+        parts = [
+            f"{'тривога' if kind == 'alarm' else 'відбій'} о {datetime.fromtimestamp(ts):%H:%M}"
+            for kind, ts in events
+        ]
+        line = f"• {REGISTRY.title(district)}: " + ", ".join(parts)
+        if board.is_active(district):
+            line += " — тривога триває"
+        for chat in routes[district]:
+            by_chat.setdefault(chat, []).append(line)
+    for chat, lines in by_chat.items():
+        spawn_background(send_alert_message(
+            "ℹ️ Поки бот був офлайн:\n" + "\n".join(lines),
+            notify=False, chat_id=chat, parse_mode=None, priority=PRIORITY_ALERT,
+        ))
+
+
+def info_targets(msg: dict, board: AlertBoard, routes: dict) -> list:
+    """Чати для INFO: райони, згадані в тексті й зараз у тривозі; без конкретного
+    району (rapid / bro_revisor / загальне GEO) — усі активні райони."""
+    concerned = [d for d in msg.get("regions") or () if board.is_active(d)]
+    if not concerned:
+        concerned = board.active_districts()
+    return list(dict.fromkeys(chat for d in concerned for chat in routes[d]))
 
 
 async def monitor_loop(channel_id: int, user_chat_id: int, start_time: datetime):
     state = load_state()
-    alert_active = state.get("alert_active", False)
-    threat_sent = set(state.get("threat_sent", []))
+    # маршрутизація district → чати (regions.json, "chats"; за замовчуванням CHANNEL_ID)
+    routes = REGISTRY.routes(default_chat=channel_id)
+    board = AlertBoard.from_state(REGISTRY.districts, state)
+    server.status["alert_active"] = board.any_active
+    server.status["active_regions"] = [REGISTRY.title(d) for d in board.active_districts()]
+    server.status["alert_regions"] = board.stats()
+    threat_sent = DedupStore.load(
+        state.get("threat_sent", []), max_size=THREAT_SENT_MAX, ttl=THREAT_SENT_TTL
+    )
+    # знімок міг відстати від журналу (падіння між записами) — доганяємо
+    replayed = replay_journal(board, threat_sent, state)
+    if replayed:
+        print(f"[JOURNAL] Програно {replayed} записів")
+        update_alert_status(board, state, server.status)
+    # один дайджест на чат, створюється при першому INFO
+    digests: dict = {}
+    # переходи з catch-up: district → [(alarm|all_clear, час поста)], до кінця прогону
+    missed: dict = {}
+    # тексти тривог з catch-up, ще не розісланих: district → текст
+    missed_alarms: dict = {}
+
+    def close_digests(district: str):
+        for chat in routes[district]:
+            digest = digests.get(chat)
+            if digest is not None:
+                spawn_background(digest.close())
 
     while True:
-        msg = await tg_checker.check_telegram_channels()
-        if not msg:
-            await asyncio.sleep(1)
+        # Блокуюче очікування черги: alarm/all_clear обробляються першими
+        msg = await tg_checker.next_message()
+        if msg["type"] == tg_checker.CATCH_UP_DONE:
+            # тривога, що почалась під час розриву і досі триває, — звичайною тривогою
+            announced = announce_missed(board, routes, missed_alarms)
+            for district in announced:
+                if [kind for kind, _ in missed.get(district, ())] == ["alarm"]:
+                    del missed[district]  # у зведенні вже нема чого казати
+            if announced:
+                update_alert_status(board, state, server.status)
+            if missed:
+                report_missed(missed, board, routes)
+            missed.clear()
+            missed_alarms.clear()
             continue
+        server.status["last_dispatch_ms"] = msg.get("dispatch_latency_ms")
+        if msg["type"] in ("alarm", "all_clear"):
+            print(f"[DISPATCH] {msg['type']} через {msg.get('dispatch_latency_ms')} мс після постановки в чергу")
 
         # нормалізуємо дату для статусу
+        posted_at = None
         if isinstance(msg.get("date"), datetime):
+            posted_at = msg["date"].timestamp()
             msg["date"] = msg["date"].isoformat()
 
         server.status["messages_received"] += 1
-        server.status["last_messages"].append(msg)
-        if len(server.status["last_messages"]) > 100:
-            server.status["last_messages"] = server.status["last_messages"][-100:]
+        server.add_message(msg)
+        server.publish_status()
 
-        district = (msg.get("district") or "").lower().strip()
         text = msg.get("text", "") or ""
         msg_id = msg.get("id")
+        journal.append(
+            "event", id=msg_id, type=msg["type"], source=msg.get("source"),
+            district=msg.get("district"), threat=msg.get("threat_type"),
+        )
         source_url = (msg.get("url") or "").strip()  # уже правильний air_alert_ua
         threat = msg.get("threat_type")
-        region_hit = bool(msg.get("region_hit"))   # з чекера
-        rapid_hit = bool(msg.get("rapid_hit"))     # з чекера
-        revisor_bonus = bool(msg.get("revisor_bonus"))  # ✓ додано
+        relevance = float(msg.get("relevance") or 0.0)  # бал з чекера (utils/scoring)
 
         # ---------- ALARM / ALL_CLEAR (офіційні події вже відфільтровані в чекері) ----------
         if msg["type"] in ("alarm", "all_clear"):
-            # працюємо лише з нашими регіонами
-            if district not in ALLOWED_DISTRICTS:
-                continue
-
-            # Старт тривоги
-            if msg["type"] == "alarm" and not alert_active:
-                alert_active = True
-                threat_sent.clear()
-                update_alert_status(True, state, server.status)
-
-                server.status["logs"].append(
-                    f"Тривога у {district.title()}: {text[:120]}"
-                )
-                if len(server.status["logs"]) > 100:
-                    server.status["logs"] = server.status["logs"][-100:]
-
-                alert_text = (
-                    f"🚨 Повітряна тривога — {district.title()}!\n"
-                    + (f"• Можлива загроза: {threat}\n" if threat else "")
-                    + (f"• Джерело: {source_url}\n" if source_url else "")
-                    + "Будьте в укриттях."
-                )
-                screenshot_path = await take_alert_screenshot()
-                if screenshot_path:
-                    await send_alert_with_screenshot(
-                        alert_text, screenshot_path, chat_id=channel_id
+            # канонічні district з реєстру; один пост може зачіпати кілька наших районів
+            names = msg.get("districts") or [msg.get("district") or ""]
+            districts = [d for d in dict.fromkeys(map(REGISTRY.resolve, names)) if d]
+            changed = False
+            # пропущене під час простою: стан і журнал оновлюємо за часом поста;
+            # тривоги, що досі тривають, і відбої розісланих тривог ідуть у чати,
+            # решта — беззвучним зведенням наприкінці catch-up
+            catch_up = bool(msg.get("catch_up"))
+            at = posted_at if catch_up else None
+
+            for district in districts:
+                district_title = REGISTRY.title(district)
+
+                # Старт тривоги в районі
+                if msg["type"] == "alarm":
+                    first = not board.any_active
+                    if (region := board.start(district, trigger_id=msg_id, now=at)) is None:
+                        continue
+                    journal.append("alarm", district=district, id=msg_id, at=at, catch_up=catch_up)
+                    changed = True
+                    if first:
+                        threat_sent.clear()
+                    close_digests(district)  # нова тривога — новий дайджест
+                    alert_text = alarm_text(district_title, threat, source_url)
+                    if catch_up:
+                        # розішлемо наприкінці catch-up, якщо не буде відбою (announce_missed)
+                        missed.setdefault(district, []).append(("alarm", at or time.time()))
+                        missed_alarms[district] = alert_text
+                        add_log(f"Пропущена тривога у {district_title} (catch-up): {text[:120]}")
+                        continue
+                    add_log(f"Тривога у {district_title}: {text[:120]}")
+                    send_alarm(alert_text, routes[district])
+                    region.announced = True
+
+                # Відбій у районі
+                elif (region := board.clear(district, now=at)) is not None:
+                    # відбій розісланої тривоги шлемо завжди, навіть з catch-up
+                    announced, region.announced = region.announced, False
+                    missed_alarms.pop(district, None)
+                    journal.append(
+                        "all_clear", district=district, id=msg_id, duration=region.last_duration,
+                        at=at, catch_up=catch_up,
                     )
-                else:
-                    # Markdown тут безпечний (текст контрольований)
-                    await send_alert_message(
-                        alert_text, notify=True, chat_id=channel_id, parse_mode="Markdown"
+                    changed = True
+                    close_digests(district)
+                    lasted = (
+                        format_duration(region.last_duration)
+                        if region.last_duration is not None else None
+                    )
+                    if catch_up and not announced:
+                        missed.setdefault(district, []).append(("all_clear", at or time.time()))
+                        add_log(f"Пропущений відбій у {district_title} (catch-up): {text[:120]}")
+                        continue
+                    add_log(
+                        f"Відбій у {district_title}"
+                        + (f" (тривала {lasted})" if lasted else "")
+                        + f": {text[:120]}"
                     )
 
-            # Відбій
-            elif msg["type"] == "all_clear" and alert_active:
-                alert_active = False
-                update_alert_status(False, state, server.status)
-
-                server.status["logs"].append(
-                    f"Відбій у {district.title()}: {text[:120]}"
-                )
-                if len(server.status["logs"]) > 100:
-                    server.status["logs"] = server.status["logs"][-100:]
-
-                alert_text = (
-                    f"✅ Відбій тривоги — {district.title()}!\n"
-                    + (f"• Джерело: {source_url}" if source_url else "")
-                )
-                await send_alert_message(
-                    alert_text, notify=True, chat_id=channel_id, parse_mode="Markdown"
-                )
-
-            state["threat_sent"] = list(threat_sent)
+                    alert_text = (
+                        f"✅ Відбій тривоги — {district_title}!\n"
+                        + (f"• Тривала: {lasted}\n" if lasted else "")
+                        + (f"• Джерело: {source_url}" if source_url else "")
+                    )
+                    for chat in routes[district]:
+                        spawn_background(send_alert_message(
+                            alert_text, notify=True, chat_id=chat, parse_mode="Markdown",
+                            priority=PRIORITY_ALERT,
+                        ))
+
+            if changed:
+                update_alert_status(board, state, server.status)
+            state["threat_sent"] = threat_sent.dump()
+            state["journal_seq"] = journal.seq
             save_state(state)
             continue
 
         # ---------- INFO ПІД ЧАС ТРИВОГИ ----------
-        # Під час активної тривоги шлемо в канал info, якщо:
-        #   - є наші GEO (region_hit), АБО
-        #   - це швидка загроза (rapid_hit: балістика/МіГ/пуск), АБО
-        #   - це короткий апдейт від bro_revisor (revisor_bonus).
-        if msg["type"] == "info" and alert_active and msg_id not in threat_sent:
-            if region_hit or rapid_hit or revisor_bonus:
-                server.status["logs"].append(f"Новина: {text[:160]}")
-                if len(server.status["logs"]) > 100:
-                    server.status["logs"] = server.status["logs"][-100:]
+        # Під час активної тривоги шлемо info в канали активних районів, якщо бал
+        # релевантності (GEO × близькість, швидкі загрози, бонуси джерела,
+        # довіра до джерела) не нижчий за RELEVANCE_THRESHOLD.
+        if msg["type"] == "info" and board.any_active and not threat_sent.seen(msg_id):
+            if SCORER.passes(relevance):
+                add_log(f"Новина: {text[:160]}")
 
                 # ВАЖЛИВО: без parse_mode — не ламаємо сирі URL з підкресленнями
                 forward_text = f"⚠️ {text}"
                 if source_url:
                     forward_text += f"\n• Джерело: {source_url}"
-                await send_alert_message(
-                    forward_text, notify=False, chat_id=channel_id, parse_mode=None
-                )
+                targets = info_targets(msg, board, routes)
+                journal.append("forward", id=msg_id, chats=targets)
+                for chat in targets:
+                    if DIGEST_ENABLED:
+                        # сплески INFO зливаються в одне повідомлення, що дописується
+                        digest = digests.get(chat)
+                        if digest is None:
+                            digest = digests[chat] = InfoDigest(chat)
+                        digest.add(forward_text)
+                    else:
+                        # не чекаємо: INFO може стояти в черзі через ліміти, а цикл
+                        # має одразу бути готовим до наступної тривоги
+                        spawn_background(send_alert_message(
+                            forward_text, notify=False, chat_id=chat, parse_mode=None,
+                            priority=PRIORITY_INFO,
+                        ))
 
                 threat_sent.add(msg_id)
-                state["threat_sent"] = list(threat_sent)
+                server.status["dedup"]["forwarded"] = threat_sent.stats()
+                state["threat_sent"] = threat_sent.dump()
+                state["journal_seq"] = journal.seq
                 save_state(state)
             else:
                 # діагностика чому пропущено
-                why = []
-                if not region_hit:
-                    why.append("нема GEO")
-                if not rapid_hit:
-                    why.append("нема RAPID")
-                if not revisor_bonus:
-                    why.append("нема REVISOR")
-                server.status["logs"].append(
-                    f"Пропущено info ({', '.join(why)}): {text[:120]}"
+                signals = ", ".join(msg.get("signals") or []) or "без ознак"
+                journal.append("skip", id=msg_id, relevance=relevance, signals=msg.get("signals") or [])
+                add_log(
+                    f"Пропущено info (бал {relevance:.2f} < {SCORER.threshold:.2f}; {signals}): {text[:120]}"
                 )
-                if len(server.status["logs"]) > 100:
-                    server.status["logs"] = server.status["logs"][-100:]
 
 
 async def uptime_loop(user_chat_id: int, start_time: datetime):
@@ -191,16 +444,28 @@ async def main():
             print("Онови TELETHON_SESSION у .env (QR/генератор сесії).")
             return
 
-    # catch-up вимкнено (економія лімітів)
-    # await tg_checker.fetch_last_messages(60)
+    # catch-up пропущеного (лише нові id по last_ids) — всередині start_monitoring
+
+    # журнал подій: відкриваємо до monitor_loop, щоб програти хвіст
+    journal.open()
+
+    # спільний клієнт Bot API (keep-alive пул) і теплий браузер для скріншотів
+    await start_sender()
+    start_screenshot_worker()
 
     await server.start_web_server()
 
-    await asyncio.gather(
-        tg_checker.start_monitoring(),
-        monitor_loop(channel_id, user_chat_id, start_time),
-        uptime_loop(user_chat_id, start_time),
-    )
+    try:
+        await asyncio.gather(
+            tg_checker.start_monitoring(),
+            monitor_loop(channel_id, user_chat_id, start_time),
+            uptime_loop(user_chat_id, start_time),
+        )
+    finally:
+        stop_screenshot_worker()
+        await close_sender()
+        await flush_state()
+        journal.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+# tests/test_dedup_restart.py
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+from utils.dedup import DedupStore
+from utils.message_id import make_message_id
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# (source, tg_message_id, text, url) — усі три гілки make_message_id
+CASES = [
+    ("air_alert_ua", 12345, "", ""),
+    ("Bro_Revisor", 77, "текст", "https://t.me/Bro_Revisor/77"),
+    (None, None, "", "https://t.me/kyivoda/501"),
+    ("manual", None, "Ручна подія", ""),
+    (None, None, "🚨 Повітряна тривога в Броварський район", ""),
+]
+
+_SCRIPT = (
+    "import json, sys\n"
+    "from utils.message_id import make_message_id\n"
+    "cases = json.loads(sys.argv[1])\n"
+    "print(json.dumps([make_message_id(s, i, text=t, url=u) for s, i, t, u in cases]))\n"
+)
+
+
+def _ids_in_subprocess(hash_seed: str) -> list[str]:
+    env = dict(os.environ, PYTHONHASHSEED=hash_seed, PYTHONIOENCODING="utf-8")
+    out = subprocess.run(
+        [sys.executable, "-c", _SCRIPT, json.dumps(CASES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, encoding="utf-8", check=True,
+    )
+    return json.loads(out.stdout)
+
+
+def test_message_ids_stable_across_hash_seeds():
+    first = _ids_in_subprocess("1")
+    second = _ids_in_subprocess("4242")
+    assert first == second
+    assert first == [make_message_id(s, i, text=t, url=u) for s, i, t, u in CASES]
+    assert first[:3] == ["air_alert_ua:12345", "bro_revisor:77", "kyivoda:501"]
+    assert all(mid.startswith("fp:") for mid in first[3:])
+
+
+def test_dedup_survives_restart_roundtrip():
+    ids = _ids_in_subprocess("7")
+    store = DedupStore(max_size=100, ttl=3600)
+    for mid in ids:
+        store.add(mid)
+
+    # як у state.json: dump() → JSON на диск → load() у новому процесі
+    restored = DedupStore.load(json.loads(json.dumps(store.dump())), max_size=100, ttl=3600)
+
+    # «новий процес» з іншим PYTHONHASHSEED рахує ті самі id
+    for mid in _ids_in_subprocess("99"):
+        assert restored.seen(mid)
+    assert not restored.seen(make_message_id("air_alert_ua", 12346))
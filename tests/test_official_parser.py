@@ -0,0 +1,135 @@
+# tests/test_official_parser.py
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from utils.filter import parse_official_post, classify_message
+from utils.regions import REGISTRY
+
+POSTS_PATH = Path(__file__).resolve().parent / "data" / "official_posts.json"
+with open(POSTS_PATH, "r", encoding="utf-8") as f:
+    ARCHIVED_POSTS = json.load(f)
+
+URL = "https://t.me/air_alert_ua/1"
+
+
+# ---------- регресія на архівних постах @air_alert_ua ----------
+@pytest.mark.parametrize("post", ARCHIVED_POSTS, ids=lambda p: p["text"][:40])
+def test_archived_post(post):
+    parsed = parse_official_post(post["text"].lower())
+    assert (list(parsed) if parsed else None) == post["expected"]
+
+    classified = classify_message(post["text"], URL, source="air_alert_ua")
+    if post["ours"]:
+        assert classified["type"] == post["expected"][0]
+        assert classified["districts"] == post["ours"]
+        assert classified["district"] == post["ours"][0]
+    else:
+        assert classified is None
+
+
+# ---------- seeded fuzz ----------
+OURS = ["Броварський район", "Київська область"]
+FOREIGN = [
+    "Обухівський район", "Бориспільський район", "Вишгородський район",
+    "Харківська область", "Сумська область", "м. Київ",
+]
+EVENTS = {"alarm": "Повітряна тривога", "all_clear": "Відбій тривоги"}
+PREFIXES = ["", "🔴 ", "🟢 23:14 ", "**", "⚠️ 02:01 ", "  "]
+INTROS = [" в ", " у ", "  в  ", " — ", " – ", " - ", " —", "\tу\t"]
+JOINERS = [", ", " ,  ", "; ", " та ", "  і  ", " й ", ",\t"]
+ENDINGS = ["", ".", "!", " ‼️", " 🔴", "**", "  ", ".  "]
+JUNK_WORDS = [
+    "слідкуйте", "за", "подальшими", "повідомленнями", "в", "у", "—", "-", ",",
+    "та", "і", "тривога", "укриття", "будьте", "обережні", "23:14", "🚨", "‼️",
+    "https://t.me/air_alert_ua", "**", "(", ")", "шахед", "ракета", "\t",
+    *OURS, *FOREIGN,  # назви районів не в рядку події не мають потрапити в результат
+]
+
+
+def _expected_name(name: str) -> str:
+    return name.lower().replace("м. ", "")
+
+
+def _spaced(rng: random.Random, phrase: str) -> str:
+    """Випадкові пробіли/таби між словами і регістр."""
+    words = phrase.split(" ")
+    out = words[0]
+    for word in words[1:]:
+        out += rng.choice([" ", "  ", "\t", " \t "]) + word
+    return rng.choice([out, out.upper(), out.lower()])
+
+
+def _junk(rng: random.Random) -> str:
+    return " ".join(rng.choice(JUNK_WORDS) for _ in range(rng.randint(20, 400)))
+
+
+def _make_post(rng: random.Random):
+    typ = rng.choice(list(EVENTS))
+    names = rng.sample(OURS + FOREIGN, rng.randint(1, 4))
+
+    tail = _spaced(rng, names[0])
+    for name in names[1:]:
+        tail += rng.choice(JOINERS) + _spaced(rng, name)
+    intro = rng.choice(INTROS)
+    if intro.strip() in "—–-" and rng.random() < 0.5:
+        intro = " 23:14" + intro  # «Повітряна тривога 23:14 — …»
+    ending = rng.choice(ENDINGS)
+    event_line = rng.choice(PREFIXES) + _spaced(rng, EVENTS[typ]) + intro + tail + ending
+    if ending.strip() in (".", "!") and ending.strip():
+        event_line += " " + _junk(rng)  # після крапки/«!» — вже не район
+
+    tagged = [n for n in names if rng.random() < 0.5]
+    hashtags = ["#" + n.replace(". ", "_").replace(" ", "_") for n in tagged]
+    lines = [event_line, _junk(rng), _junk(rng)]
+    if hashtags:
+        lines.append(" ".join(hashtags))
+    # порядок рядків довільний: район береться лише з рядка події
+    rng.shuffle(lines)
+    return "\n".join(lines), typ, names, hashtags
+
+
+def test_fuzz_official_posts():
+    rng = random.Random(20261018)
+    for _ in range(3000):
+        text, typ, names, hashtags = _make_post(rng)
+
+        parsed = parse_official_post(text.lower())
+        assert parsed is not None, text
+        got_typ, districts, got_tags = parsed
+        assert got_typ == typ, text
+        assert districts == list(dict.fromkeys(map(_expected_name, names))), text
+        assert got_tags == [t.lower() for t in hashtags], text
+
+        classified = classify_message(text, URL, source="air_alert_ua")
+        ours = [d for d in dict.fromkeys(map(REGISTRY.resolve, names)) if d]
+        if ours:
+            assert classified["type"] == typ
+            assert classified["districts"] == ours, text
+        else:
+            assert classified is None, text
+
+
+def test_fuzz_garbage_does_not_crash():
+    rng = random.Random(7)
+    alphabet = "абвгґдеєжзиіїйклмнопрстуфхцчшщьюя .,;:!?-—–#*_()\n\t‼️🔴🟢0123456789"
+    phrases = ["повітряна тривога", "відбій тривоги", " в ", " у ", "м. ", " та ", "#"]
+    for _ in range(3000):
+        chunks = [
+            rng.choice(phrases) if rng.random() < 0.3
+            else "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+            for _ in range(rng.randint(1, 20))
+        ]
+        text = "".join(chunks)
+        parsed = parse_official_post(text.lower())
+        if parsed is None:
+            continue
+        typ, districts, hashtags = parsed
+        assert typ in ("alarm", "all_clear")
+        for district in districts:
+            assert district and "\n" not in district
+            assert district == district.strip()
+        assert all(tag.startswith("#") for tag in hashtags)
+        classify_message(text, URL, source="air_alert_ua")
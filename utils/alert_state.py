@@ -0,0 +1,146 @@
+# utils/alert_state.py
+import time
+from datetime import datetime
+
+
+def format_duration(seconds: float) -> str:
+    minutes = int(seconds) // 60
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours} год {minutes} хв"
+    return f"{minutes} хв"
+
+
+class RegionAlert:
+    """Стан тривоги одного району: поточна тривога + накопичена статистика."""
+    __slots__ = (
+        "district", "active", "started_at", "ended_at", "trigger_id",
+        "last_duration", "count", "total_duration", "announced",
+    )
+
+    def __init__(self, district: str):
+        self.district = district
+        self.active = False
+        self.started_at: float | None = None   # unix-час початку поточної/останньої тривоги
+        self.ended_at: float | None = None     # unix-час останнього відбою
+        self.trigger_id = None                 # id повідомлення, що запустило тривогу
+        self.last_duration: float | None = None
+        self.count = 0                         # скільки тривог завершилось
+        self.total_duration = 0.0              # їхня сумарна тривалість, с
+        self.announced = False                 # чи розіслано поточну тривогу в чати
+
+    @property
+    def duration(self) -> float | None:
+        """Тривалість поточної тривоги (або останньої, якщо зараз відбій)."""
+        if self.active:
+            return time.time() - self.started_at if self.started_at else None
+        return self.last_duration
+
+    def to_dict(self) -> dict:
+        return {
+            "active": self.active,
+            "started_at": int(self.started_at) if self.started_at else None,
+            "ended_at": int(self.ended_at) if self.ended_at else None,
+            "trigger_id": self.trigger_id,
+            "last_duration": int(self.last_duration) if self.last_duration is not None else None,
+            "count": self.count,
+            "total_duration": int(self.total_duration),
+            "announced": self.announced,
+        }
+
+    def load(self, data: dict):
+        self.active = bool(data.get("active"))
+        self.started_at = data.get("started_at")
+        self.ended_at = data.get("ended_at")
+        self.trigger_id = data.get("trigger_id")
+        self.last_duration = data.get("last_duration")
+        self.count = int(data.get("count") or 0)
+        self.total_duration = float(data.get("total_duration") or 0)
+        # без поля (старий state.json) — активну тривогу розсилав попередній процес
+        self.announced = bool(data.get("announced", True))
+
+
+class AlertBoard:
+    """Незалежні автомати тривоги по районах: переходи — O(1) за district."""
+
+    def __init__(self, districts):
+        self.regions: dict[str, RegionAlert] = {d: RegionAlert(d) for d in districts}
+        self._active: dict[str, None] = {}  # впорядкована множина активних
+
+    @property
+    def any_active(self) -> bool:
+        return bool(self._active)
+
+    def is_active(self, district: str) -> bool:
+        return district in self._active
+
+    def active_districts(self) -> list[str]:
+        return list(self._active)
+
+    def start(self, district: str, trigger_id=None, now: float | None = None) -> RegionAlert | None:
+        """Тривога в районі. Повертає стан району, якщо це новий перехід."""
+        region = self.regions.get(district)
+        if region is None or region.active:
+            return None
+        region.active = True
+        region.started_at = now or time.time()
+        region.trigger_id = trigger_id
+        region.announced = False
+        self._active[district] = None
+        return region
+
+    def clear(self, district: str, now: float | None = None) -> RegionAlert | None:
+        """Відбій у районі. Повертає стан із last_duration, якщо район був у тривозі."""
+        region = self.regions.get(district)
+        if region is None or not region.active:
+            return None
+        now = now or time.time()
+        region.active = False
+        region.ended_at = now
+        # після рестарту зі старого state.json початок може бути невідомим
+        region.last_duration = now - region.started_at if region.started_at else None
+        if region.last_duration is not None:
+            region.count += 1
+            region.total_duration += region.last_duration
+        self._active.pop(district, None)
+        return region
+
+    def stats(self) -> dict:
+        """Коротка статистика по районах для /status."""
+        return {d: r.to_dict() for d, r in self.regions.items()}
+
+    def to_state(self, state: dict, title=lambda district: district):
+        state["alert_regions"] = self.stats()
+        state["active_regions"] = self.active_districts()
+        state["alert_active"] = self.any_active  # сумісність зі старим state.json
+        started = state.setdefault("alert_started_at", {})
+        for district, region in self.regions.items():
+            started[title(district)] = (
+                datetime.fromtimestamp(region.started_at).isoformat(timespec="seconds")
+                if region.active and region.started_at else None
+            )
+
+    @classmethod
+    def from_state(cls, districts, state: dict) -> "AlertBoard":
+        board = cls(districts)
+        saved = state.get("alert_regions") or {}
+        for district, region in board.regions.items():
+            if district in saved:
+                region.load(saved[district])
+                region.active = False  # нижче — через start(), щоб оновити _active
+        active = state.get("active_regions")
+        if active is None and state.get("alert_active"):
+            # старий state.json: один прапорець без району — вважаємо активними всі
+            active = list(board.regions)
+        for district in active or []:
+            region = board.regions.get(district)
+            if region is None:
+                continue
+            started_at, trigger_id = region.started_at, region.trigger_id
+            announced = bool((saved.get(district) or {}).get("announced", True))
+            board.start(district)
+            # час початку не губимо; без збереженого (старий формат) — невідомий
+            region.started_at = started_at
+            region.trigger_id = trigger_id
+            region.announced = announced
+        return board
@@ -0,0 +1,68 @@
+# utils/coalesce.py
+import time
+import asyncio
+
+
+class _Slot:
+    __slots__ = ("opened_at", "pending", "handle")
+
+    def __init__(self, opened_at: float):
+        self.opened_at = opened_at
+        self.pending = None   # (score, item) — найважливіше за поточне вікно
+        self.handle = None
+
+
+class CoalescingBuffer:
+    """Не частіше одного повідомлення на ключ (канал) за window секунд — але без втрат.
+
+    Перше повідомлення у вільному вікні обробляється одразу. Решта в межах
+    вікна не відкидаються: у буфері лишається одне найважливіше (за score,
+    при рівності — новіше), і воно віддається в on_flush наприкінці вікна.
+    Лічильники: passed — одразу, merged — віддані з буфера наприкінці вікна,
+    suppressed — витіснені важливішим/новішим у тому ж вікні.
+    """
+
+    def __init__(self, window: float, on_flush):
+        self.window = window
+        self.on_flush = on_flush  # async (key, item)
+        self._slots: dict = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.passed = 0
+        self.merged = 0
+        self.suppressed = 0
+
+    def offer(self, key, score: float, item) -> bool:
+        """True — обробити зараз; False — повідомлення в буфері (або витіснене)."""
+        now = time.monotonic()
+        slot = self._slots.get(key)
+        if slot is None or (slot.pending is None and now - slot.opened_at >= self.window):
+            self._slots[key] = _Slot(now)
+            self.passed += 1
+            return True
+
+        if slot.pending is None:
+            slot.pending = (score, item)
+            slot.handle = asyncio.get_running_loop().call_later(
+                max(slot.opened_at + self.window - now, 0.0), self._fire, key
+            )
+        else:
+            self.suppressed += 1
+            if score >= slot.pending[0]:
+                slot.pending = (score, item)
+        return False
+
+    def _fire(self, key):
+        slot = self._slots.get(key)
+        if slot is None or slot.pending is None:
+            return
+        _, item = slot.pending
+        slot.pending = None
+        slot.handle = None
+        slot.opened_at = time.monotonic()  # віддане з буфера відкриває нове вікно
+        self.merged += 1
+        task = asyncio.create_task(self.on_flush(key, item))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        return {"passed": self.passed, "merged": self.merged, "suppressed": self.suppressed}
@@ -0,0 +1,87 @@
+# utils/dedup.py
+import time
+from collections import OrderedDict
+
+
+class DedupStore:
+    """Множина «вже бачили» з LRU + TTL.
+
+    OrderedDict у порядку останнього додавання: вставка, пошук і
+    витіснення — O(1); розмір ніколи не перевищує max_size, записи
+    старші за ttl секунд вважаються відсутніми. Час — настінний
+    (time.time()), тож дамп переживає рестарт процесу.
+    """
+
+    def __init__(self, max_size: int = 2000, ttl: float = 6 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def _expire(self, now: float):
+        # найстаріші — спереду, тож чистимо лише доки трапляються протерміновані
+        while self._items:
+            key, ts = next(iter(self._items.items()))
+            if now - ts < self.ttl:
+                break
+            self._items.popitem(last=False)
+
+    def seen(self, key) -> bool:
+        """Чи є ключ (і не протермінований); рахує hits/misses."""
+        now = time.time()
+        ts = self._items.get(key)
+        if ts is not None and now - ts < self.ttl:
+            self.hits += 1
+            return True
+        if ts is not None:
+            del self._items[key]
+        self.misses += 1
+        return False
+
+    def add(self, key):
+        now = time.time()
+        self._items[key] = now
+        self._items.move_to_end(key)
+        self._expire(now)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def check_and_add(self, key) -> bool:
+        """True — дублікат; інакше запам'ятовує ключ і повертає False."""
+        if self.seen(key):
+            return True
+        self.add(key)
+        return False
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+    def dump(self) -> list:
+        """Компактно для state.json: [[key, unix_ts], ...] від найстарішого."""
+        self._expire(time.time())
+        return [[key, int(ts)] for key, ts in self._items.items()]
+
+    @classmethod
+    def load(cls, items, **kwargs) -> "DedupStore":
+        """Відновлює з dump(); старий формат (просто список ключів) теж приймається."""
+        store = cls(**kwargs)
+        now = time.time()
+        for item in items or []:
+            if isinstance(item, list) and len(item) == 2:
+                key, ts = item
+            else:
+                key, ts = item, now
+            store._items[key] = float(ts)
+        # у дампі порядок за часом; на всяк випадок сортуємо і обрізаємо
+        store._items = OrderedDict(sorted(store._items.items(), key=lambda kv: kv[1]))
+        store._expire(now)
+        while len(store._items) > store.max_size:
+            store._items.popitem(last=False)
+        return store
@@ -0,0 +1,109 @@
+# utils/digest.py
+import os
+import time
+import asyncio
+from datetime import datetime
+
+from utils.sender import send_alert_message, edit_message_text
+from utils.send_queue import PRIORITY_INFO
+
+DIGEST_ENABLED = os.getenv("INFO_DIGEST", "1") != "0"
+# Скільки секунд одне повідомлення-дайджест лишається «живим» для дописування
+DIGEST_WINDOW = float(os.getenv("INFO_DIGEST_WINDOW", "180"))
+# Скільки чекаємо, збираючи сплеск INFO в одну відправку/редагування
+DIGEST_FLUSH_DELAY = float(os.getenv("INFO_DIGEST_FLUSH", "3"))
+
+MAX_MESSAGE_LEN = 4096
+DIGEST_HEADER = "📡 Оновлення під час тривоги"
+_SEPARATOR = "\n\n"
+
+
+class InfoDigest:
+    """Зливає INFO-форварди в одне повідомлення, яке дописується через editMessageText.
+
+    Нові записи накопичуються DIGEST_FLUSH_DELAY секунд і йдуть одним викликом.
+    Коли повідомлення старше DIGEST_WINDOW або далі не влазить у 4096 символів —
+    починається новий дайджест.
+    """
+
+    def __init__(self, chat_id, window: float = DIGEST_WINDOW, flush_delay: float = DIGEST_FLUSH_DELAY):
+        self.chat_id = chat_id
+        self.window = window
+        self.flush_delay = flush_delay
+        self.entries: list[str] = []   # уже опубліковані в поточному дайджесті
+        self.pending: list[str] = []   # чекають наступного flush
+        self.message_id = None
+        self.started_at = 0.0
+        self._flush_task: asyncio.Task | None = None
+        self._failures = 0  # невдалі відправки поспіль — для паузи перед повтором
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def render(entries: list[str]) -> str:
+        return DIGEST_HEADER + _SEPARATOR + _SEPARATOR.join(entries)
+
+    def add(self, text: str):
+        entry = f"🕒 {datetime.now().strftime('%H:%M')} {text}"
+        # один запис, довший за ліміт, обрізаємо, щоб він влазив сам
+        limit = MAX_MESSAGE_LEN - len(self.render([]))
+        if len(entry) > limit:
+            entry = entry[: limit - 1] + "…"
+        self.pending.append(entry)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self, delay: float | None = None):
+        await asyncio.sleep(self.flush_delay if delay is None else delay)
+        await self.flush()
+
+    def _start_new(self):
+        self.message_id = None
+        self.entries = []
+
+    async def flush(self):
+        async with self._lock:
+            while self.pending:
+                if self.message_id is not None and time.monotonic() - self.started_at > self.window:
+                    self._start_new()
+
+                batch: list[str] = []
+                while self.pending and len(self.render(self.entries + batch + self.pending[:1])) <= MAX_MESSAGE_LEN:
+                    batch.append(self.pending.pop(0))
+                if not batch:
+                    self._start_new()  # поточний дайджест заповнений
+                    continue
+
+                text = self.render(self.entries + batch)
+                if self.message_id is None:
+                    message_id = await send_alert_message(
+                        text, notify=False, chat_id=self.chat_id, parse_mode=None,
+                        priority=PRIORITY_INFO,
+                    )
+                    if not message_id:
+                        # помилку вже залоговано відправником; записи повертаємо
+                        # в чергу і повторюємо пізніше, а не зливаємо решту
+                        self.pending[:0] = batch
+                        self._failures += 1
+                        break
+                    self._failures = 0
+                    self.message_id = message_id
+                    self.started_at = time.monotonic()
+                    self.entries = batch
+                elif await edit_message_text(self.chat_id, self.message_id, text, priority=PRIORITY_INFO):
+                    self.entries += batch
+                else:
+                    # повідомлення могли видалити — переносимо записи в новий дайджест
+                    self._start_new()
+                    self.pending[:0] = batch
+
+        retry_scheduled = self._flush_task is not None and not self._flush_task.done() \
+            and self._flush_task is not asyncio.current_task()
+        if self.pending and self._failures and not retry_scheduled:
+            # Bot API недоступний — повтор з наростаючою паузою (не довше вікна)
+            delay = min(self.flush_delay * 2 ** self._failures, self.window)
+            self._flush_task = asyncio.create_task(self._flush_later(delay))
+
+    async def close(self):
+        """Відправляє все, що лишилось, і завершує поточний дайджест."""
+        await self.flush()
+        self._start_new()
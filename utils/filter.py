@@ -1,17 +1,15 @@
 # utils/filter.py
 import re
 
-ALLOWED_DISTRICTS = {"броварський район", "київська область"}
+from utils.message_id import make_message_id
+from utils.keywords import KeywordMatcher
+from utils.regions import REGISTRY
+
+# Райони, хештеги і GEO-стеми — з реєстру регіонів (alert_sources/regions.json)
+ALLOWED_DISTRICTS = REGISTRY.districts
+REGION_KEYWORDS = REGISTRY.stems
+HASHTAG_MAP = REGISTRY.hashtags
 
-REGION_KEYWORDS = [
-    "бровар", "бровари", "броварський",
-    "київська область", "київщина", "київ",
-    "княжич", "требух", "калинівк", "велика димер", "мала димер",
-    "богданівк", "красилівк", "погреб", "зазим", "літк", "пухівк",
-    "рожн", "світильн", "семиполк", "квітнев", "перемог", "гогол", "калит",
-    "бориспіл", "троєщин", "лісов", "дарниц", "вишгород", "обух",
-    "ірпін", "буча", "гостомел", "вишнев", "васильк", "березан", "баришівк",
-]
 RAPID_THREATS = [
     "балістик", "баллистик",
     "іскандер", "искандер",
@@ -24,78 +22,95 @@ THREAT_WORDS = [
     "шахед", "shahed", "дрон", "бпла", "ракета", "балістик", "іскандер", "кинжал",
 ]
 
-# ------- ОФІЦІЙНІ ПОСТИ @air_alert_ua: кілька патернів -------
-RE_BASE = re.compile(
-    r"(повітряна\s+тривога|відбій\s+тривоги)\s+(?:в|у)\s+([^\n\.#!\*\)]+)",
-    re.IGNORECASE | re.UNICODE,
-)
-RE_WITH_DASH = re.compile(
-    r"(повітряна\s+тривога|відбій\s+тривоги)[^\n]*?(?:—|-|–)\s*([^\n\.#!\*\)]+)",
-    re.IGNORECASE | re.UNICODE,
-)
-RE_LOOSE = re.compile(
-    r"(повітряна\s+тривога|відбій\s+тривоги)(?:[^\n]*?(?:в|у)\s+)?([^\n\.#!\*\)]+)",
+# Категорії для спільного матчера (чекер додає свої і передає готові hits)
+KEYWORD_CATEGORIES = {
+    **REGISTRY.keyword_categories(),  # "region" + "region:<district>"
+    "rapid": RAPID_THREATS,
+    "threat": THREAT_WORDS,
+}
+MATCHER = KeywordMatcher(KEYWORD_CATEGORIES)
+
+# ------- ОФІЦІЙНІ ПОСТИ @air_alert_ua: один прохід токенізатора -------
+# Токени: фраза події або хештег; район — хвіст рядка після фрази
+_OFFICIAL_TOKEN_RE = re.compile(
+    r"(?P<event>повітряна\s+тривога|відбій\s+тривоги)|(?P<tag>#\w+)",
     re.IGNORECASE | re.UNICODE,
 )
-
-HASHTAG_MAP = {
-    "#броварський_район": "броварський район",
-    "#київська_область": "київська область",
-}
+_LEADING_PREPOSITION_RE = re.compile(r"\s*(?:в|у)\s+")  # «Повітряна тривога в …»
+_PREPOSITION_RE = re.compile(r"(?:^|\s)(?:в|у)\s+")   # «... в Броварський район»
+_DASH_RE = re.compile(r"[—–-]\s*")                     # «... — Броварський район»
+_CITY_PREFIX_RE = re.compile(r"(?<!\w)м\.\s*")          # «м. Київ» — крапка не кінець району
+_DISTRICT_STOP_RE = re.compile(r"[\.#!\)]")
+_DISTRICT_SPLIT_RE = re.compile(r"\s*[,;]\s*|\s+(?:та|і|й)\s+")
 
 def _norm_district(d: str) -> str:
     d = (d or "").strip().lower()
     d = d.replace("м. ", "").strip()
-    # прибираємо хвости: пробіли, зірочки, хеш-символи, крапки, коми, окремі zero-width
-    d = re.sub(r"[\s\*\#\.\!\,\u200d\ufe0f]+$", "", d).strip()
-    return d
+    # прибираємо з країв: пробіли, розмітку (**), пунктуацію, емодзі (‼️), zero-width
+    d = re.sub(r"^[\W_]+|[\W_]+$", "", d)
+    # подвійні пробіли/таби всередині назви — як один
+    return re.sub(r"\s+", " ", d)
 
-def _is_region_hit(lower: str) -> bool:
-    return any(k in lower for k in REGION_KEYWORDS)
-
-def _is_rapid_hit(lower: str) -> bool:
-    return any(k in lower for k in RAPID_THREATS)
-
-def _guess_threat(lower: str):
+def _guess_threat(hits: dict[str, set[str]]):
+    found = hits.get("threat")
+    if not found:
+        return None
     for w in THREAT_WORDS:
-        if w in lower:
+        if w in found:
             return w
     return None
 
-def _try_official_parse(lower: str):
-    for rx in (RE_BASE, RE_WITH_DASH, RE_LOOSE):
-        m = rx.search(lower)
-        if not m:
+def _districts_from_tail(tail: str) -> list[str]:
+    """Райони з решти рядка після фрази події; кілька — через кому/«та»/«і»."""
+    # межу речення шукаємо до вступу: тире чи «в» після крапки — вже не район.
+    # Розмітку (**) і «м. » прибираємо заздалегідь — це не кінець району.
+    tail = _CITY_PREFIX_RE.sub("", tail.replace("*", ""))
+    stop = _DISTRICT_STOP_RE.search(tail)
+    if stop:
+        tail = tail[:stop.start()]
+    m = _LEADING_PREPOSITION_RE.match(tail)
+    if m is None:
+        # спершу тире одразу після фрази/часу, потім прийменник будь-де в реченні
+        m = _DASH_RE.search(tail) or _PREPOSITION_RE.search(tail)
+    span = tail[m.end():] if m else tail
+    districts = []
+    for part in _DISTRICT_SPLIT_RE.split(span):
+        district = _norm_district(part)
+        if district:
+            districts.append(district)
+    return districts
+
+def parse_official_post(lower: str):
+    """Розбирає пост @air_alert_ua за один прохід.
+
+    Повертає (typ, districts, hashtags) або None, якщо фрази події немає;
+    typ — 'alarm' | 'all_clear' за першою фразою, districts — райони лише з
+    фраз того самого типу (відбій в одному районі й тривога в іншому не
+    змішуються), hashtags — усі хештеги.
+    """
+    typ = None
+    districts: list[str] = []
+    hashtags: list[str] = []
+    for m in _OFFICIAL_TOKEN_RE.finditer(lower):
+        if m.lastgroup == "tag":
+            hashtags.append(m.group())
             continue
-        phrase = (m.group(1) or "").lower()
-        raw_district = (m.group(2) or "").strip()
-        district_norm = _norm_district(raw_district)
-        if "повітряна" in phrase:
-            typ = "alarm"
-        elif "відбій" in phrase:
-            typ = "all_clear"
-        else:
+        event = "alarm" if m.group().startswith("повітряна") else "all_clear"
+        if typ is None:
+            typ = event
+        elif event != typ:
             continue
-        return typ, district_norm
-    return None
-
-def _try_hashtag_fallback(lower: str):
-    found = None
-    for tag, norm in HASHTAG_MAP.items():
-        if tag in lower:
-            found = norm
-            break
-    if not found:
-        return None
-    if "повітряна тривога" in lower:
-        typ = "alarm"
-    elif "відбій тривоги" in lower:
-        typ = "all_clear"
-    else:
+        line_end = lower.find("\n", m.end())
+        tail = lower[m.end():] if line_end == -1 else lower[m.end():line_end]
+        for district in _districts_from_tail(tail):
+            if district not in districts:
+                districts.append(district)
+    if typ is None:
         return None
-    return typ, found
+    return typ, districts, hashtags
 
-def classify_message(text: str, url: str, source: str | None = None):
+def classify_message(text: str, url: str, source: str | None = None, hits: dict | None = None):
+    """hits — результат MATCHER.scan(lower), якщо викликач уже сканував текст."""
     if not text:
         return None
 
@@ -103,35 +118,42 @@ def classify_message(text: str, url: str, source: str | None = None):
 
     # 1) Офіційний канал
     if source == "air_alert_ua":
-        parsed = _try_official_parse(lower) or _try_hashtag_fallback(lower)
-        if not parsed:
+        parsed = parse_official_post(lower)
+        if parsed:
+            typ, districts, hashtags = parsed
+            # хештеги — лише запасний варіант: у змішаному пості вони не кажуть,
+            # до якої події (тривоги чи відбою) належить район
+            if not districts:
+                districts = [tag for tag in hashtags if tag in HASHTAG_MAP]
+        if not parsed or not districts:
             print(f"[FILTER DEBUG] Official miss: {text[:180].replace(chr(10), ' ')}")
             return None
-        typ, district_norm = parsed
-        if district_norm not in ALLOWED_DISTRICTS:
-            print(f"[FILTER DEBUG] Official other district: '{district_norm}'")
+        # назви, RU/UA-варіанти і хештеги → канонічний district реєстру
+        ours = list(dict.fromkeys(d for d in map(REGISTRY.resolve, districts) if d))
+        if not ours:
+            print(f"[FILTER DEBUG] Official other district: {districts}")
             return None
         return {
-            "district": district_norm,
+            "district": ours[0],
+            "districts": ours,
             "text": text,
             "url": url,
-            "id": hash(text + url),
+            "id": make_message_id(source, text=text, url=url),
             "type": typ,
+            "source": source,
         }
 
-    # 2) Неофіційні → info
-    region_hit = _is_region_hit(lower)
-    rapid_hit = _is_rapid_hit(lower)
-    threat = _guess_threat(lower)
+    # 2) Неофіційні → info (бал релевантності — utils/scoring, у enrich_info)
+    if hits is None:
+        hits = MATCHER.scan(lower)
+    threat = _guess_threat(hits)
 
     return {
         "district": None,
         "text": text,
         "url": url,
-        "id": hash(text + url),
+        "id": make_message_id(source, text=text, url=url),
         "type": "info",
-        "region_hit": region_hit,
-        "rapid_hit": rapid_hit,
         "threat_type": threat,
         "source": source,
     }
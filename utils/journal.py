@@ -0,0 +1,199 @@
+# utils/journal.py
+import os
+import json
+import time
+import bisect
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "journal")
+# Розмір сегмента, після якого починається новий файл
+SEGMENT_BYTES = int(os.getenv("JOURNAL_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+# Скільки останніх сегментів зберігати на диску
+KEEP_SEGMENTS = int(os.getenv("JOURNAL_KEEP_SEGMENTS", "8"))
+# Кожен N-й запис потрапляє в індекс (ts, seq, зсув у файлі)
+INDEX_EVERY = 64
+
+_SEGMENT_SUFFIX = ".jsonl"
+_INDEX_SUFFIX = ".idx"
+
+
+def _encode(record: dict) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class _Segment:
+    """Один файл журналу + його розріджений індекс [(ts, seq, offset)]."""
+    __slots__ = ("first_seq", "path", "index_path", "index")
+
+    def __init__(self, directory: str, first_seq: int):
+        self.first_seq = first_seq
+        name = f"{first_seq:012d}"
+        self.path = os.path.join(directory, name + _SEGMENT_SUFFIX)
+        self.index_path = os.path.join(directory, name + _INDEX_SUFFIX)
+        self.index: list[tuple[float, int, int]] = []
+
+    def load_index(self):
+        self.index = []
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 3:
+                        self.index.append((float(parts[0]), int(parts[1]), int(parts[2])))
+        except FileNotFoundError:
+            pass
+
+    def offset_for(self, since: float | None, after_seq: int) -> int:
+        """Зсув, з якого точно починаються потрібні записи (бінарний пошук по індексу)."""
+        if not self.index:
+            return 0
+        if since is not None:
+            pos = bisect.bisect_right([e[0] for e in self.index], since) - 1
+        else:
+            pos = bisect.bisect_right([e[1] for e in self.index], after_seq) - 1
+        return self.index[pos][2] if pos >= 0 else 0
+
+
+class Journal:
+    """Append-only журнал подій у JSONL-сегментах.
+
+    Кожен запис — {"seq", "ts", "kind", ...}. seq наскрізний між сегментами,
+    сегмент називається за першим seq. Запис на диск — в окремому потоці
+    (як state.json), порядок зберігається. read() за розрідженим індексом
+    одразу переходить до потрібного місця, не читаючи журнал з початку.
+    """
+
+    def __init__(self, directory: str = JOURNAL_DIR, segment_bytes: int = SEGMENT_BYTES,
+                 keep_segments: int = KEEP_SEGMENTS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.keep_segments = keep_segments
+        self.seq = 0
+        self._segments: list[_Segment] = []
+        self._file = None
+        self._size = 0
+        self._since_index = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal-writer")
+        self._opened = False
+
+    # ---------- відкриття / відновлення ----------
+    def open(self):
+        if self._opened:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(_SEGMENT_SUFFIX) and name[: -len(_SEGMENT_SUFFIX)].isdigit():
+                segment = _Segment(self.directory, int(name[: -len(_SEGMENT_SUFFIX)]))
+                segment.load_index()
+                self._segments.append(segment)
+        if self._segments:
+            self._recover_tail(self._segments[-1])
+        self._opened = True
+        print(f"[JOURNAL] {len(self._segments)} сегментів, останній seq={self.seq}")
+
+    def _recover_tail(self, segment: _Segment):
+        """Обрізає недописаний останній рядок (обрив під час запису) і знаходить seq."""
+        with open(segment.path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+            data = data[:end]
+        self._size = len(data)
+        last = data[:-1].rsplit(b"\n", 1)[-1] if data else b""
+        self.seq = json.loads(last)["seq"] if last else segment.first_seq - 1
+        self._since_index = self.seq - segment.index[-1][1] + 1 if segment.index else INDEX_EVERY
+
+    # ---------- запис ----------
+    def append(self, kind: str, **fields) -> int:
+        """Додає запис і повертає його seq; сам запис на диск — у фоновому потоці."""
+        self.seq += 1
+        record = {"seq": self.seq, "ts": round(time.time(), 3), "kind": kind, **fields}
+        payload = _encode(record)
+        try:
+            asyncio.get_running_loop().run_in_executor(
+                self._writer, self._write, record["seq"], record["ts"], payload
+            ).add_done_callback(_on_write_done)
+        except RuntimeError:
+            self._write(record["seq"], record["ts"], payload)
+        return self.seq
+
+    def _write(self, seq: int, ts: float, payload: bytes):
+        if self._file is None or self._size >= self.segment_bytes:
+            self._rotate(seq)
+        segment = self._segments[-1]
+        if self._since_index >= INDEX_EVERY:
+            segment.index.append((ts, seq, self._size))
+            with open(segment.index_path, "a", encoding="utf-8") as f:
+                f.write(f"{ts} {seq} {self._size}\n")
+            self._since_index = 0
+        self._file.write(payload)
+        self._file.flush()
+        self._size += len(payload)
+        self._since_index += 1
+
+    def _rotate(self, seq: int):
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+        if not self._segments or self._size >= self.segment_bytes:
+            self._segments.append(_Segment(self.directory, seq))
+            self._size = 0
+            self._since_index = INDEX_EVERY  # перший запис сегмента завжди в індексі
+        self._file = open(self._segments[-1].path, "ab")
+        # найстаріші сегменти прибираємо
+        while len(self._segments) > self.keep_segments:
+            old = self._segments.pop(0)
+            for path in (old.path, old.index_path):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    # ---------- читання ----------
+    def read(self, since: float | None = None, after_seq: int = 0):
+        """Записи з ts >= since (або seq > after_seq), від старіших до новіших.
+
+        Викликається до початку запису (старт) — файли ще ніхто не дописує.
+        """
+        segments = self._segments
+        if since is not None:
+            starts = [s.index[0][0] if s.index else 0.0 for s in segments]
+            first = max(bisect.bisect_right(starts, since) - 1, 0)
+        else:
+            first = max(bisect.bisect_right([s.first_seq for s in segments], after_seq) - 1, 0)
+        for segment in segments[first:]:
+            try:
+                f = open(segment.path, "rb")
+            except FileNotFoundError:
+                continue
+            with f:
+                f.seek(segment.offset_for(since, after_seq))
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record["seq"] <= after_seq or (since is not None and record["ts"] < since):
+                        continue
+                    yield record
+
+    def close(self):
+        def _close():
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+        self._writer.submit(_close).result()
+        self._writer.shutdown(wait=True)
+
+
+def _on_write_done(fut):
+    if not fut.cancelled() and fut.exception():
+        print(f"❌ Помилка запису журналу: {fut.exception()}")
+
+
+journal = Journal()
@@ -0,0 +1,82 @@
+# utils/keywords.py
+import re
+from typing import Iterable
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Регекс-альтернація у вигляді префіксного дерева: спільні префікси
+    перевіряються один раз, а жадібні опційні групи дають найдовший збіг."""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Усі категорії ключових слів за один прохід по тексту.
+
+    Ключі шукаються як підрядки (як `k in lower`). Регекс-дерево на кожній
+    позиції бере найдовший ключ; усі ключі, що є його підрядками, додаються
+    з заздалегідь порахованого замикання. Рідкісні ключі, що можуть
+    починатися всередині збігу і виходити за його межі, доперевіряються
+    точково. Результат збігається з послідовними `any(k in lower for k in keys)`.
+    """
+
+    def __init__(self, categories: dict[str, Iterable[str]]):
+        self._categories: dict[str, set[str]] = {}
+        for category, keys in categories.items():
+            for key in keys:
+                if key:
+                    self._categories.setdefault(key, set()).add(category)
+
+        keywords = sorted(self._categories)
+        proper_prefixes = {key[:i] for key in keywords for i in range(1, len(key))}
+
+        # для кожного ключа: (ключ, категорія) всіх ключів-підрядків, включно з ним
+        self._covered: dict[str, tuple[tuple[str, str], ...]] = {}
+        # зсуви всередині ключа, з яких може початися довший ключ, що виходить за його межі
+        self._straddle: dict[str, tuple[int, ...]] = {}
+        for key in keywords:
+            pairs = {
+                (key[i:j], category)
+                for i in range(len(key))
+                for j in range(i + 1, len(key) + 1)
+                for category in self._categories.get(key[i:j], ())
+            }
+            self._covered[key] = tuple(sorted(pairs))
+            self._straddle[key] = tuple(i for i in range(1, len(key)) if key[i:] in proper_prefixes)
+
+        self._regex = re.compile(f"({_trie_pattern(keywords)})") if keywords else None
+
+    def _longest_at(self, lower: str, pos: int):
+        m = self._regex.match(lower, pos)
+        return m.group(1) if m else None
+
+    def scan(self, lower: str) -> dict[str, set[str]]:
+        """Повертає {категорія: {знайдені ключі}} лише для категорій зі збігами."""
+        found: dict[str, set[str]] = {}
+        if self._regex is None:
+            return found
+        for m in self._regex.finditer(lower):
+            key = m.group(1)
+            for sub, category in self._covered[key]:
+                found.setdefault(category, set()).add(sub)
+            for offset in self._straddle[key]:
+                extra = self._longest_at(lower, m.start() + offset)
+                if extra is not None:
+                    for sub, category in self._covered[extra]:
+                        found.setdefault(category, set()).add(sub)
+        return found
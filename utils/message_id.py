@@ -0,0 +1,30 @@
+# utils/message_id.py
+import re
+import hashlib
+
+# https://t.me/<username>/<message_id>
+_TG_URL_RE = re.compile(r"^https?://t\.me/([A-Za-z0-9_]+)/(\d+)")
+
+
+def content_fingerprint(*parts) -> str:
+    """Детермінований короткий відбиток (blake2b, 64 біти) — однаковий у будь-якому процесі,
+    на відміну від hash(), який солиться при кожному запуску."""
+    h = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        h.update(str(part or "").encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def make_message_id(source: str | None = None, tg_message_id=None, text: str = "", url: str = "") -> str:
+    """Стабільний id повідомлення: "<канал>:<id у Telegram>".
+
+    Якщо id з Telegram немає — пробуємо дістати його з t.me-посилання,
+    інакше беремо відбиток вмісту "fp:<hex>".
+    """
+    if source and tg_message_id is not None:
+        return f"{source.lower()}:{tg_message_id}"
+    m = _TG_URL_RE.match(url or "")
+    if m:
+        return f"{m.group(1).lower()}:{m.group(2)}"
+    return "fp:" + content_fingerprint(source, text, url)
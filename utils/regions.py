@@ -0,0 +1,114 @@
+# utils/regions.py
+import os
+import re
+import json
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+# Інша область — інший файл: REGIONS_PATH=/path/to/regions.json
+REGIONS_PATH = Path(os.getenv("REGIONS_PATH") or BASE_DIR / "alert_sources" / "regions.json")
+
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_name(name: str) -> str:
+    """Ключ для індексу: нижній регістр, один пробіл, уніфікований апостроф."""
+    name = (name or "").strip().lower().replace("ʼ", "'").replace("’", "'")
+    return _SPACES_RE.sub(" ", name)
+
+
+def _chat_id(value):
+    """"$CHANNEL_ID" → значення змінної середовища; числові id → int."""
+    if isinstance(value, str) and value.startswith("$"):
+        value = os.getenv(value[1:])
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value  # "@channel_username"
+
+
+class Region:
+    __slots__ = ("district", "title", "aliases", "hashtags", "stems", "chats", "proximity")
+
+    def __init__(self, district: str, title: str, aliases: list[str], hashtags: list[str],
+                 stems: list[str], chats: list | None = None, proximity: float = 1.0):
+        self.district = district
+        self.title = title
+        self.aliases = aliases
+        self.hashtags = hashtags
+        self.stems = stems
+        self.chats = chats or []
+        self.proximity = proximity  # вага GEO-згадки для оцінки релевантності
+
+
+class RegionRegistry:
+    """Усі регіони, за якими стежить процес, і індекси для швидкого пошуку.
+
+    district — канонічна назва (нижній регістр, як у постах air_alert_ua),
+    title — для показу людям. Будь-яка назва/варіант RU/UA/хештег
+    резолвиться в district одним пошуком у dict.
+    """
+
+    def __init__(self, regions: list[Region]):
+        self.regions = regions
+        self.by_district: dict[str, Region] = {r.district: r for r in regions}
+        self.districts: frozenset[str] = frozenset(self.by_district)
+        self.titles: list[str] = [r.title for r in regions]
+
+        self._index: dict[str, str] = {}
+        for r in regions:
+            for name in (r.district, r.title, *r.aliases):
+                self._index.setdefault(normalize_name(name), r.district)
+        self.hashtags: dict[str, str] = {
+            normalize_name(tag): r.district for r in regions for tag in r.hashtags
+        }
+
+        # GEO-стеми: загальний список і по регіонах (без дублікатів, порядок збережено)
+        self.stems: list[str] = list(dict.fromkeys(s for r in regions for s in r.stems))
+
+    def resolve(self, name: str) -> str | None:
+        """Канонічний district за назвою, аліасом або хештегом; None — не наш регіон."""
+        key = normalize_name(name)
+        return self._index.get(key) or self.hashtags.get(key)
+
+    def title(self, district: str) -> str:
+        region = self.by_district.get(district)
+        return region.title if region else district.title()
+
+    def routes(self, default_chat) -> dict[str, tuple]:
+        """Таблиця маршрутизації district → чати; без "chats" — у default_chat."""
+        return {
+            r.district: tuple(dict.fromkeys(c for c in map(_chat_id, r.chats) if c is not None)) or (default_chat,)
+            for r in self.regions
+        }
+
+    def keyword_categories(self) -> dict[str, list[str]]:
+        """Категорії для KeywordMatcher: "region" — усі стеми, "region:<district>" — по регіонах."""
+        categories = {"region": self.stems}
+        for r in self.regions:
+            categories[f"region:{r.district}"] = r.stems
+        return categories
+
+
+def load_registry(path: Path = REGIONS_PATH) -> RegionRegistry:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    regions = []
+    for item in data["regions"]:
+        district = normalize_name(item["district"])
+        regions.append(Region(
+            district=district,
+            title=item.get("title") or district.title(),
+            aliases=item.get("aliases", []),
+            hashtags=item.get("hashtags", []),
+            stems=[normalize_name(s) for s in item.get("stems", [])],
+            chats=item.get("chats", []),
+            proximity=float(item.get("proximity", 1.0)),
+        ))
+    print(f"[CFG] Loaded {len(regions)} regions from {path}")
+    return RegionRegistry(regions)
+
+
+REGISTRY = load_registry()
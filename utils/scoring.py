@@ -0,0 +1,74 @@
+# utils/scoring.py
+import os
+from typing import Iterable, NamedTuple
+
+from utils.regions import REGISTRY
+
+# Поріг пересилання INFO під час тривоги
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.5"))
+
+# Категорія матчера → (ознака, вага). Синонімічні категорії фільтра і чекера
+# дають одну ознаку: у бал іде найбільша вага ознаки, а не сума повторів.
+CATEGORY_FEATURES = {
+    "rapid": ("rapid", 1.0),        # utils/filter.RAPID_THREATS
+    "rapid_any": ("rapid", 1.0),    # prefilter.THREAT_KEYWORDS_RAPID
+    "threat": ("threat", 0.3),
+    "threat_any": ("threat", 0.2),
+    "alarm_phrase": ("alarm_phrase", 0.1),
+}
+
+# Бонусні фрази, що рахуються лише для свого джерела
+SOURCE_BONUS = {
+    "bro_revisor": ("revisor_bonus", 1.0),
+}
+
+# Довіра до джерела — множник бала
+SOURCE_REPUTATION = {
+    "air_alert_ua": 1.0,
+    "bro_revisor": 1.0,
+}
+DEFAULT_REPUTATION = 0.8
+
+
+class Relevance(NamedTuple):
+    score: float
+    signals: tuple[str, ...]  # які ознаки дали бал (для логів/статусу)
+
+
+class RelevanceScorer:
+    """Числовий бал релевантності INFO з результату KeywordMatcher.scan.
+
+    Таблиця категорія → (ознака, вага) будується один раз; GEO-ознака —
+    близькість найближчого згаданого району ("proximity" у regions.json).
+    Бал = довіра_джерела × Σ ваг ознак. Один прохід лише по знайдених
+    категоріях, тож ціна не залежить від кількості ключів і районів.
+    """
+
+    def __init__(self, threshold: float = RELEVANCE_THRESHOLD):
+        self.threshold = threshold
+        self._features = dict(CATEGORY_FEATURES)
+        for region in REGISTRY.regions:
+            self._features[f"region:{region.district}"] = ("geo", region.proximity)
+
+    def score(self, hits: dict, source: str | None) -> Relevance:
+        best: dict[str, float] = {}
+        for category in hits:
+            feature = self._features.get(category)
+            if feature is not None and feature[1] > best.get(feature[0], 0.0):
+                best[feature[0]] = feature[1]
+        bonus = SOURCE_BONUS.get(source)
+        if bonus is not None and bonus[0] in hits:
+            best[bonus[0]] = bonus[1]
+        reputation = SOURCE_REPUTATION.get(source, DEFAULT_REPUTATION)
+        return Relevance(round(reputation * sum(best.values()), 3), tuple(sorted(best)))
+
+    def score_many(self, batch: Iterable[tuple[dict, str | None]]) -> list[Relevance]:
+        """Пакетний варіант для catch-up і програвання журналу."""
+        score = self.score
+        return [score(hits, source) for hits, source in batch]
+
+    def passes(self, score: float) -> bool:
+        return score >= self.threshold
+
+
+SCORER = RelevanceScorer()
@@ -1,11 +1,26 @@
 import os
 import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 
-def clean_old_screenshots(folder="screenshots", days=1):
+ALERTS_MAP_URL = "https://alerts.in.ua/"
+SCREENSHOT_DIR = "screenshots"
+CHROMEDRIVER_PATH = "/usr/bin/chromedriver"
+
+# Скільки чекаємо скріншот, перш ніж слати тривогу лише текстом
+SCREENSHOT_DEADLINE = float(os.getenv("SCREENSHOT_DEADLINE", "8"))
+# Як часто перезавантажуємо сторінку карти у «теплому» браузері
+PAGE_REFRESH_INTERVAL = float(os.getenv("SCREENSHOT_REFRESH_INTERVAL", "60"))
+MAX_WINDOW_SIZE = 900
+
+
+def clean_old_screenshots(folder=SCREENSHOT_DIR, days=1):
     now = time.time()
     cutoff = now - days * 86400  # секунд у 1 дні
 
@@ -21,42 +36,134 @@ def clean_old_screenshots(folder="screenshots", days=1):
                 os.remove(filepath)
                 print(f"Видалено старий файл: {filepath}")
 
-async def take_alert_screenshot():
-    clean_old_screenshots()
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = "screenshots"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, f"alert_{timestamp}.png")
-    url = "https://alerts.in.ua/"
+class _BrowserWorker(threading.Thread):
+    """Довгоживучий headless Chrome в окремому потоці.
 
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=900,900")
-    chrome_options.add_argument("--disable-gpu")
+    Тримає сторінку карти відкритою, оновлює її у простої і знімає скріншоти
+    на запит — Selenium ніколи не виконується в event loop.
+    """
 
-    service = Service("/usr/bin/chromedriver")
+    def __init__(self):
+        super().__init__(name="screenshot-worker", daemon=True)
+        self._jobs: queue.Queue = queue.Queue()
+        self._driver = None
+        self._loaded_at = 0.0
 
-    try:
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.get(url)
+    def submit(self) -> Future:
+        fut: Future = Future()
+        self._jobs.put(fut)
+        return fut
+
+    def stop(self):
+        self._jobs.put(None)
+
+    def run(self):
+        self._refresh()  # прогрів: браузер і сторінка готові до першої тривоги
+        while True:
+            try:
+                job = self._jobs.get(timeout=PAGE_REFRESH_INTERVAL)
+            except queue.Empty:
+                self._refresh()
+                continue
+            if job is None:
+                break
+            if not job.set_running_or_notify_cancel():
+                continue  # запит вже протерміновано
+            try:
+                job.set_result(self._capture())
+            except Exception as e:
+                print(f"❌ Помилка при створенні скріншота: {e}")
+                self._quit()  # наступний запит підніме браузер заново
+                job.set_result(None)
+        self._quit()
+
+    def _ensure_driver(self):
+        if self._driver is not None:
+            return
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument(f"--window-size={MAX_WINDOW_SIZE},{MAX_WINDOW_SIZE}")
+        chrome_options.add_argument("--disable-gpu")
+
+        driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=chrome_options)
         driver.implicitly_wait(10)
+        driver.get(ALERTS_MAP_URL)
+        self._driver = driver
+        self._loaded_at = time.monotonic()
+        self._fit_window()
+        print("🖥 Браузер для скріншотів запущено")
+
+    def _fit_window(self):
+        total_width = self._driver.execute_script("return document.body.scrollWidth")
+        total_height = self._driver.execute_script("return document.body.scrollHeight")
+        self._driver.set_window_size(
+            min(total_width, MAX_WINDOW_SIZE), min(total_height, MAX_WINDOW_SIZE)
+        )
 
-        total_width = driver.execute_script("return document.body.scrollWidth")
-        total_height = driver.execute_script("return document.body.scrollHeight")
+    def _refresh(self):
+        try:
+            if self._driver is None:
+                self._ensure_driver()
+                return
+            self._driver.refresh()
+            self._loaded_at = time.monotonic()
+        except Exception as e:
+            print(f"❌ Помилка оновлення сторінки карти: {e}")
+            self._quit()
 
-        max_size = 900
-        width = min(total_width, max_size)
-        height = min(total_height, max_size)
-        driver.set_window_size(width, height)
+    def _capture(self) -> str:
+        self._ensure_driver()
+        if time.monotonic() - self._loaded_at > PAGE_REFRESH_INTERVAL:
+            self._refresh()
+            self._ensure_driver()
 
-        driver.save_screenshot(output_path)
-        driver.quit()
+        clean_old_screenshots()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+        output_path = os.path.join(SCREENSHOT_DIR, f"alert_{timestamp}.png")
+        self._driver.save_screenshot(output_path)
         print(f"🖼 Скріншот збережено: {output_path}")
         return output_path
 
-    except Exception as e:
-        print(f"❌ Помилка при створенні скріншота: {e}")
+    def _quit(self):
+        if self._driver is None:
+            return
+        try:
+            self._driver.quit()
+        except Exception:
+            pass
+        self._driver = None
+
+
+_worker: _BrowserWorker | None = None
+
+
+def start_screenshot_worker():
+    """Запускає (якщо ще не запущено) теплий браузер у фоновому потоці."""
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = _BrowserWorker()
+        _worker.start()
+
+
+def stop_screenshot_worker():
+    global _worker
+    if _worker is not None:
+        _worker.stop()
+        _worker = None
+
+
+async def take_alert_screenshot(deadline: float | None = None):
+    """Повертає шлях до скріншота або None, якщо не встигли за deadline секунд."""
+    start_screenshot_worker()
+    timeout = SCREENSHOT_DEADLINE if deadline is None else deadline
+    fut = _worker.submit()
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(fut), timeout=timeout)
+    except asyncio.TimeoutError:
+        fut.cancel()
+        print(f"⏱ Скріншот не готовий за {timeout:.0f} с — шлемо без нього")
         return None
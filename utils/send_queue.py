@@ -0,0 +1,189 @@
+# utils/send_queue.py
+import os
+import time
+import asyncio
+from collections import deque
+
+# Смуги пріоритету вихідних повідомлень (менше — раніше)
+PRIORITY_ALERT = 0   # тривога / відбій
+PRIORITY_NORMAL = 1  # службові: таймер, старт, карта
+PRIORITY_INFO = 2    # info-форварди — відкладаються, поки є важливіше
+
+# Ліміти Telegram: ~1 повідомлення/с в один чат (20/хв у групи), ~30/с загалом
+CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+CHAT_BURST = float(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "25"))
+MAX_RATE_LIMIT_RETRIES = 5
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # retry_after від Telegram
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Скільки секунд чекати до можливості відправки (0 — можна зараз)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class _Job:
+    __slots__ = ("method", "data", "files", "timeout", "chat", "priority", "future", "attempts")
+
+    def __init__(self, method, data, files, timeout, chat, priority, future):
+        self.method = method
+        self.data = data
+        self.files = files
+        self.timeout = timeout
+        self.chat = chat
+        self.priority = priority
+        self.future = future
+        self.attempts = 0
+
+
+class OutboundScheduler:
+    """Черга вихідних викликів Bot API.
+
+    Token bucket на кожен chat_id плюс глобальний; 429 не губить
+    повідомлення — чат «заморожується» на retry_after, а задача
+    повертається на початок своєї смуги. Різні чати шлються паралельно,
+    в межах одного чату порядок зберігається.
+    """
+
+    def __init__(self, client, *, chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST,
+                 global_rate: float = GLOBAL_RATE):
+        self.client = client
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._global = TokenBucket(global_rate, global_rate)
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lanes = [deque(), deque(), deque()]
+        self._inflight: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()  # посилання на відправки, щоб їх не прибрав GC
+        self._wakeup = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+        self.rate_limited = 0  # скільки разів отримали 429
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # відправки, що вже пішли, дочікуємо до закриття сесії
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def pending(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    async def submit(self, method: str, data: dict, *, chat_id, priority: int = PRIORITY_NORMAL,
+                     files: dict | None = None, timeout: float | None = None):
+        """Ставить виклик у чергу і чекає його результат (як BotApiClient.call)."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[priority].append(
+            _Job(method, data, files, timeout, str(chat_id), priority, future)
+        )
+        self._wakeup.set()
+        return await future
+
+    def _bucket(self, chat: str) -> TokenBucket:
+        bucket = self._buckets.get(chat)
+        if bucket is None:
+            bucket = self._buckets[chat] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _pick(self):
+        """Повертає (job, None) або (None, скільки_чекати|None)."""
+        now = time.monotonic()
+        if not self.pending():
+            return None, None
+        global_delay = self._global.delay(now)
+        if global_delay > 0:
+            return None, global_delay
+
+        wait = None
+        seen: set[str] = set()  # перша задача чату в найвищій смузі блокує решту його задач
+        for lane in self._lanes:
+            for job in lane:
+                if job.chat in seen:
+                    continue
+                seen.add(job.chat)
+                if job.chat in self._inflight:
+                    continue
+                delay = self._bucket(job.chat).delay(now)
+                if delay <= 0:
+                    lane.remove(job)
+                    return job, None
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    async def _run(self):
+        while True:
+            job, wait = self._pick()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if job.future.done():
+                continue  # викликач уже скасував
+            self._bucket(job.chat).consume()
+            self._global.consume()
+            self._inflight.add(job.chat)
+            task = asyncio.create_task(self._send(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, job: _Job):
+        # локальний імпорт: sender імпортує цей модуль
+        from utils.sender import BotApiError
+
+        try:
+            result = await self.client.call(job.method, job.data, files=job.files, timeout=job.timeout)
+            if not job.future.done():
+                job.future.set_result(result)
+        except BotApiError as e:
+            if e.status == 429 and job.attempts < MAX_RATE_LIMIT_RETRIES:
+                job.attempts += 1
+                self.rate_limited += 1
+                retry_after = e.retry_after or 1
+                print(f"⏳ 429 для чату {job.chat}: чекаємо {retry_after} с і повторюємо")
+                self._bucket(job.chat).block(retry_after)
+                self._lanes[job.priority].appendleft(job)
+            elif not job.future.done():
+                job.future.set_exception(e)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self._inflight.discard(job.chat)
+            self._wakeup.set()
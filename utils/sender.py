@@ -1,13 +1,151 @@
 import os
+import asyncio
 import aiohttp
 from datetime import datetime
 from dotenv import load_dotenv
 
+from utils.send_queue import OutboundScheduler, PRIORITY_NORMAL
+
 load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHANNEL_ID = os.getenv("CHANNEL_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
+# Методи, повтор яких після таймауту/5xx не створить дубль у чаті
+IDEMPOTENT_METHODS = {"getMe", "getChat", "editMessageText", "editMessageCaption"}
+
+
+class BotApiError(Exception):
+    """Telegram відповів помилкою (не-200 або ok=false)."""
+
+    def __init__(self, status: int, description: str, retry_after: int | None = None):
+        super().__init__(f"{status}: {description}")
+        self.status = status
+        self.description = description
+        self.retry_after = retry_after
+
+
+class BotApiClient:
+    """Спільний клієнт Bot API.
+
+    Одна aiohttp-сесія на весь процес: keep-alive пул з'єднань до
+    api.telegram.org і кеш DNS, тож під час тривоги не платимо TCP+TLS
+    рукостискання за кожне повідомлення. Повтори з експоненційною паузою:
+    для ідемпотентних методів — мережеві помилки, таймаути й 5xx; для
+    sendMessage/sendPhoto — лише помилки з'єднання до відправки запиту
+    (таймаут там міг настати вже після того, як Telegram прийняв
+    повідомлення, і повтор продублював би тривогу). 4xx (включно з 429)
+    віддаються одразу як BotApiError.
+    """
+
+    def __init__(self, token: str | None, base_url: str = TELEGRAM_API_URL, *,
+                 timeout: float = 10.0, retries: int = 2, backoff: float = 0.5,
+                 pool_size: int = 8, dns_ttl: int = 300, keepalive: float = 60.0):
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.dns_ttl = dns_ttl
+        self.keepalive = keepalive
+        self._session: aiohttp.ClientSession | None = None
+
+    async def start(self):
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive,
+        )
+        self._session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def _build_form(data: dict, files: dict) -> aiohttp.FormData:
+        form = aiohttp.FormData()
+        for key, value in data.items():
+            form.add_field(key, str(value))
+        for key, (filename, content) in files.items():
+            form.add_field(key, content, filename=filename)
+        return form
+
+    async def call(self, method: str, data: dict | None = None, *,
+                   files: dict | None = None, timeout: float | None = None,
+                   retries: int | None = None):
+        """Викликає метод Bot API і повертає поле `result`.
+
+        files: {"photo": (filename, bytes)} — надсилається multipart-формою.
+        """
+        if self._session is None or self._session.closed:
+            await self.start()  # ледачий старт для скриптів без main.main
+
+        url = f"{self.base_url}/bot{self.token}/{method}"
+        data = data or {}
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        attempts = (self.retries if retries is None else retries) + 1
+        idempotent = method in IDEMPOTENT_METHODS
+        last_error: Exception | None = None
+
+        for attempt in range(attempts):
+            try:
+                # FormData одноразова — збираємо наново на кожну спробу
+                payload = self._build_form(data, files) if files else data
+                async with self._session.post(url, data=payload, timeout=client_timeout) as response:
+                    try:
+                        body = await response.json(content_type=None)
+                    except ValueError:
+                        body = {"description": await response.text()}
+                    if response.status == 200 and body.get("ok"):
+                        return body["result"]
+                    params = body.get("parameters") or {}
+                    last_error = BotApiError(
+                        response.status, body.get("description", ""), params.get("retry_after")
+                    )
+                    if response.status < 500 or not idempotent:
+                        raise last_error
+            except BotApiError:
+                raise
+            except aiohttp.ClientConnectorError as e:
+                last_error = e  # з'єднання не встановлено — запит точно не пішов
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not idempotent:
+                    raise
+                last_error = e
+
+            if attempt + 1 < attempts:
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+
+        raise last_error
+
+
+bot_api = BotApiClient(
+    BOT_TOKEN,
+    timeout=float(os.getenv("BOT_API_TIMEOUT", "10")),
+    retries=int(os.getenv("BOT_API_RETRIES", "2")),
+)
 
-async def send_alert_message(text, notify=True, chat_id=None, parse_mode=None):
+# усі відправки йдуть через чергу з лімітами на чат і пріоритетами
+outbound = OutboundScheduler(bot_api)
+
+
+async def start_sender():
+    await bot_api.start()
+    outbound.start()
+
+
+async def close_sender():
+    await outbound.stop()
+    await bot_api.close()
+
+
+async def send_alert_message(text, notify=True, chat_id=None, parse_mode=None,
+                             priority=PRIORITY_NORMAL):
     """
     parse_mode:
       - None  -> plain text (рекомендується для INFO з сирими URL)
@@ -15,7 +153,6 @@ async def send_alert_message(text, notify=True, chat_id=None, parse_mode=None):
       - "MarkdownV2" -> за потреби (якщо екрануєш спецсимволи)
     """
     target_chat_id = chat_id or CHANNEL_ID
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
 
     data = {
         "chat_id": target_chat_id,
@@ -26,21 +163,17 @@ async def send_alert_message(text, notify=True, chat_id=None, parse_mode=None):
         data["parse_mode"] = parse_mode
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, data=data, timeout=10) as response:
-                if response.status != 200:
-                    print(f"❌ Помилка надсилання повідомлення: {await response.text()}")
-                    return None
-                else:
-                    response_json = await response.json()
-                    print(f"✅ Повідомлення надіслано")
-                    return response_json["result"]["message_id"]
+        result = await outbound.submit("sendMessage", data, chat_id=target_chat_id, priority=priority)
+        print(f"✅ Повідомлення надіслано")
+        return result["message_id"]
+    except BotApiError as e:
+        print(f"❌ Помилка надсилання повідомлення: {e}")
+        return None
     except Exception as e:
         print(f"❌ Виняток при надсиланні повідомлення: {e}")
         return None
 
 async def send_start_message(start_time, chat_id):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
     text = format_uptime_message(start_time)
     data = {
         "chat_id": chat_id,
@@ -49,19 +182,15 @@ async def send_start_message(start_time, chat_id):
         "disable_notification": True
     }
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, data=data, timeout=10) as response:
-                if response.status != 200:
-                    print(f"❌ Помилка надсилання стартового повідомлення: {await response.text()}")
-                    return None
-                else:
-                    return (await response.json())["result"]["message_id"]
+        return (await outbound.submit("sendMessage", data, chat_id=chat_id))["message_id"]
+    except BotApiError as e:
+        print(f"❌ Помилка надсилання стартового повідомлення: {e}")
+        return None
     except Exception as e:
         print(f"❌ Виняток при надсиланні стартового повідомлення: {e}")
         return None
 
 async def edit_message(message_id, start_time, chat_id):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/editMessageText"
     text = format_uptime_message(start_time)
     data = {
         "chat_id": chat_id,
@@ -70,13 +199,31 @@ async def edit_message(message_id, start_time, chat_id):
         "parse_mode": "Markdown",
     }
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, data=data, timeout=10) as response:
-                if response.status != 200:
-                    print(f"❌ Помилка оновлення повідомлення: {await response.text()}")
+        await outbound.submit("editMessageText", data, chat_id=chat_id)
+    except BotApiError as e:
+        print(f"❌ Помилка оновлення повідомлення: {e}")
     except Exception as e:
         print(f"❌ Виняток при оновленні повідомлення: {e}")
 
+async def edit_message_text(chat_id, message_id, text, parse_mode=None, priority=PRIORITY_NORMAL):
+    """Редагує текст довільного повідомлення. Повертає True при успіху."""
+    data = {
+        "chat_id": chat_id,
+        "message_id": message_id,
+        "text": text,
+    }
+    if parse_mode:
+        data["parse_mode"] = parse_mode
+    try:
+        await outbound.submit("editMessageText", data, chat_id=chat_id, priority=priority)
+        return True
+    except BotApiError as e:
+        print(f"❌ Помилка редагування повідомлення: {e}")
+        return False
+    except Exception as e:
+        print(f"❌ Виняток при редагуванні повідомлення: {e}")
+        return False
+
 def format_uptime_message(start_time):
     delta = int((datetime.now() - start_time).total_seconds())
     hours = delta // 3600
@@ -88,23 +235,36 @@ def format_uptime_message(start_time):
         "Стежу за повітряними тривогами..."
     )
 
-async def send_alert_with_screenshot(caption, screenshot_path, chat_id=None):
+async def send_alert_with_screenshot(caption, screenshot_path, chat_id=None,
+                                     reply_to_message_id=None, notify=True,
+                                     priority=PRIORITY_NORMAL):
     target_chat_id = chat_id or CHANNEL_ID
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendPhoto"
 
     try:
-        async with aiohttp.ClientSession() as session:
-            with open(screenshot_path, "rb") as image:
-                data = aiohttp.FormData()
-                data.add_field('chat_id', str(target_chat_id))
-                data.add_field('caption', caption)
-                data.add_field('photo', image)
-                data.add_field('parse_mode', 'Markdown')
-
-                async with session.post(url, data=data, timeout=20) as response:
-                    if response.status != 200:
-                        print(f"❌ Помилка надсилання скріншота: {await response.text()}")
-                    else:
-                        print(f"✅ Скріншот успішно надіслано")
+        with open(screenshot_path, "rb") as image:
+            photo = image.read()
+        data = {
+            "chat_id": target_chat_id,
+            "caption": caption,
+            "parse_mode": "Markdown",
+            "disable_notification": "false" if notify else "true",
+        }
+        if reply_to_message_id:
+            data["reply_to_message_id"] = reply_to_message_id
+
+        result = await outbound.submit(
+            "sendPhoto",
+            data,
+            chat_id=target_chat_id,
+            priority=priority,
+            files={"photo": (os.path.basename(screenshot_path), photo)},
+            timeout=20,
+        )
+        print(f"✅ Скріншот успішно надіслано")
+        return result["message_id"]
+    except BotApiError as e:
+        print(f"❌ Помилка надсилання скріншота: {e}")
+        return None
     except Exception as e:
         print(f"❌ Виняток при надсиланні скріншота: {e}")
+        return None
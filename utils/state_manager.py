@@ -1,45 +1,133 @@
+import copy
 import json
 import os
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.regions import REGISTRY
 
 STATE_PATH = os.getenv("STATE_PATH", "state.json")
+# Скільки секунд збираємо зміни стану перед одним записом на диск
+SAVE_DEBOUNCE = float(os.getenv("STATE_SAVE_DEBOUNCE", "2"))
 
 _DEFAULT_STATE = {
     "sent": [],
     "status_message_id": None,
     "alert_active": False,
     "threat_sent": [],
-    "alert_started_at": {
-        "Броварський район": None,
-        "Київська область": None
-    },
+    "alert_started_at": {title: None for title in REGISTRY.titles},
+    "alert_regions": {},
     "start_message_id": None,
     "timer_message_id": None,
     "last_ids": {}
 }
 
+# Єдиний стан у пам'яті — всі цикли працюють з одним dict
+_state: dict | None = None
+# Один потік-писач: записи йдуть строго по черзі, поза event loop
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-writer")
+_flush_handle: asyncio.TimerHandle | None = None
+_inflight: set[asyncio.Future] = set()
+
 
 def load_state() -> dict:
+    global _state
+    if _state is not None:
+        return _state
     if not os.path.exists(STATE_PATH):
-        return _DEFAULT_STATE.copy()
+        _state = copy.deepcopy(_DEFAULT_STATE)
+        return _state
     try:
         with open(STATE_PATH, "r", encoding="utf-8") as f:
             data = json.load(f)
-            # додамо відсутні ключі
-            changed = False
-            for k, v in _DEFAULT_STATE.items():
-                if k not in data:
-                    data[k] = v
-                    changed = True
-            if changed:
-                save_state(data)
-            return data
     except Exception:
-        return _DEFAULT_STATE.copy()
+        _state = copy.deepcopy(_DEFAULT_STATE)
+        return _state
+    _state = data
+    # додамо відсутні ключі
+    if ensure_state_defaults(data, copy.deepcopy(_DEFAULT_STATE)):
+        save_state(data)
+    return data
+
+
+def _encode(state: dict) -> bytes:
+    return json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _write_atomic(payload: bytes):
+    """temp-файл → fsync → rename: обрив живлення лишає або старий, або новий файл."""
+    directory = os.path.dirname(os.path.abspath(STATE_PATH))
+    fd, tmp_path = tempfile.mkstemp(prefix=".state-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, STATE_PATH)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    try:
+        # фіксуємо сам rename у каталозі (на Windows недоступно — не критично)
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+
+def _on_write_done(fut: asyncio.Future):
+    _inflight.discard(fut)
+    if not fut.cancelled() and fut.exception():
+        print(f"❌ Помилка збереження стану: {fut.exception()}")
+
+
+def _start_flush():
+    global _flush_handle
+    if _flush_handle is not None:
+        _flush_handle.cancel()
+        _flush_handle = None
+    if _state is None:
+        return
+    # знімок кодуємо в циклі (dict міг би змінитись під час запису), пишемо — у потоці
+    payload = _encode(_state)
+    fut = asyncio.get_running_loop().run_in_executor(_writer, _write_atomic, payload)
+    _inflight.add(fut)
+    fut.add_done_callback(_on_write_done)
+
+
+def save_state(state: dict, immediate: bool = False):
+    """Фіксує стан у пам'яті й планує запис на диск поза event loop.
+
+    Звичайні зміни зливаються в один запис за SAVE_DEBOUNCE секунд;
+    immediate=True (переходи тривоги) пише одразу. Без запущеного
+    циклу (старт, скрипти) пише синхронно.
+    """
+    global _state, _flush_handle
+    _state = state
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _write_atomic(_encode(state))
+        return
+    if immediate:
+        _start_flush()
+    elif _flush_handle is None:
+        _flush_handle = loop.call_later(SAVE_DEBOUNCE, _start_flush)
 
 
-def save_state(state: dict):
-    with open(STATE_PATH, "w", encoding="utf-8") as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
+async def flush_state():
+    """Записує відкладені зміни і чекає завершення всіх записів (для зупинки)."""
+    if _flush_handle is not None:
+        _start_flush()
+    if _inflight:
+        await asyncio.gather(*list(_inflight), return_exceptions=True)
 
 
 def ensure_state_defaults(state: dict, defaults: dict) -> bool:
@@ -1,51 +1,241 @@
 from aiohttp import web
+from collections import deque
 from datetime import datetime
+from pathlib import Path
 import asyncio
+import gzip
+import hashlib
+import itertools
 import json
+import os
+import time
+
+try:
+    import brotli  # необов'язково: pip install brotli
+except ImportError:
+    brotli = None
+
+try:
+    import orjson  # необов'язково: pip install orjson — у кілька разів швидше за json
+except ImportError:
+    orjson = None
+
+
+def _dumps(data) -> bytes:
+    """JSON у UTF-8 байтах: orjson, якщо встановлено, інакше стандартний json."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str)
+    return json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+
+from utils.message_id import make_message_id
+from utils.regions import REGISTRY
 
 # Глобальний статус
 status = {
     "start_time": datetime.now(),
     "alert_active": False,
+    "active_regions": [],  # назви районів, де зараз тривога
+    "alert_regions": {},   # по районах: початок/кінець, тривалість, лічильники
     "messages_received": 0,
     "last_messages": [],  # останні сирі повідомлення (dict)
     "logs": [],           # текстові логи
+    "last_dispatch_ms": None,  # затримка черга → диспетчер для останнього повідомлення
+    "dedup": {},               # лічильники hits/misses дедуплікації
+    "coalesce": {},            # вікно каналів: passed / merged / suppressed
 }
 
 # ====== SSE інфраструктура ======
-_subscribers: set[asyncio.Queue] = set()
-_sub_lock = asyncio.Lock()
+# Потік подій з id: snapshot (лише при підключенні) і frame — пачка нових
+# повідомлень, рядків логу та змін статусу не частіше SSE_MAX_RATE Гц.
+# Останні SSE_BUFFER подій — у кільцевому буфері для дочитування за Last-Event-ID.
+SSE_BUFFER = int(os.getenv("SSE_BUFFER", "256"))
+# Черга одного підписника обмежена; повільний клієнт або втрачає найстаріше
+# (і отримує свіжий знімок), або відключається — за SSE_SLOW_POLICY
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "64"))
+SSE_SLOW_POLICY = os.getenv("SSE_SLOW_POLICY", "drop_oldest")  # drop_oldest | disconnect
+# Стеля частоти кадрів SSE, Гц: під час флуду CPU не росте з вхідним трафіком
+SSE_MAX_RATE = float(os.getenv("SSE_MAX_RATE", "5"))
+MAX_LOGS = 100
+MAX_MESSAGES = 100
+
+
+class _Subscriber:
+    """Обмежена черга готових байтів одного SSE-клієнта."""
+    __slots__ = ("queue", "wakeup", "lagged", "closed", "dropped")
+
+    def __init__(self):
+        self.queue: deque = deque()  # (event_id, payload_bytes)
+        self.wakeup = asyncio.Event()
+        self.lagged = False   # були втрати — перед наступними подіями потрібен знімок
+        self.closed = False
+        self.dropped = 0
+
+    def offer(self, event_id: int, payload: bytes):
+        if len(self.queue) >= SSE_QUEUE_SIZE:
+            if SSE_SLOW_POLICY == "disconnect":
+                self.closed = True
+                self.wakeup.set()
+                return
+            self.queue.popleft()
+            self.dropped += 1
+            self.lagged = True
+        self.queue.append((event_id, payload))
+        self.wakeup.set()
+
+
+_subscribers: set[_Subscriber] = set()
+_sse_stats = {"subscribers": 0, "dropped": 0, "disconnected": 0}
+_event_ids = itertools.count(1)
+_last_event_id = 0
+# Префікс id подій і ETag /status: лічильник подій після рестарту знову з 1,
+# тож Last-Event-ID від попереднього процесу не має збігтися з новим потоком
+_BOOT_ID = format(int(status["start_time"].timestamp() * 1_000_000), "x")
+_ring: deque = deque(maxlen=SSE_BUFFER)  # (id, payload)
+_last_status_view: dict | None = None
+
+def _message_view(msg: dict) -> dict:
+    msg_copy = dict(msg)
+    if isinstance(msg_copy.get("date"), datetime):
+        msg_copy["date"] = msg_copy["date"].isoformat()
+    return msg_copy
+
+def _uptime() -> str:
+    return str(datetime.now() - status["start_time"]).split('.')[0]
+
+def _status_view() -> dict:
+    """Скалярна частина статусу — те, що шле подія status."""
+    return {
+        "alert_active": status["alert_active"],
+        "active_regions": status["active_regions"],
+        "alert_regions": status["alert_regions"],
+        "messages_received": status["messages_received"],
+        "last_dispatch_ms": status["last_dispatch_ms"],
+        "dedup": status["dedup"],
+        "coalesce": status["coalesce"],
+        "sse": _sse_stats,
+    }
 
 def _serialize_status():
     """Підготувати безпечний для JSON знімок статусу (дати -> ISO рядки)."""
-    last_messages_serializable = []
-    for msg in status["last_messages"][-30:]:
-        msg_copy = dict(msg)
-        if isinstance(msg_copy.get("date"), datetime):
-            msg_copy["date"] = msg_copy["date"].isoformat()
-        last_messages_serializable.append(msg_copy)
-
     return {
-        "uptime": str(datetime.now() - status["start_time"]).split('.')[0],
-        "alert_active": status["alert_active"],
-        "messages_received": status["messages_received"],
-        "last_messages": last_messages_serializable,
+        "uptime": _uptime(),
+        **_status_view(),
+        "last_messages": [_message_view(m) for m in status["last_messages"][-30:]],
         "logs": status["logs"][-30:],
+        "regions": REGISTRY.titles,
+        "last_event_id": f"{_BOOT_ID}-{_last_event_id}",
     }
 
-async def push_update(snapshot: dict | None = None):
-    """Публікує знімок статусу всім підписникам SSE."""
-    data = snapshot or _serialize_status()
-    payload = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-    async with _sub_lock:
-        dead = []
-        for q in _subscribers:
-            try:
-                q.put_nowait(payload)
-            except Exception:
-                dead.append(q)
-        for q in dead:
-            _subscribers.discard(q)
+def _format_event(event_id: int | None, event_type: str, data: dict) -> bytes:
+    head = f"id: {_BOOT_ID}-{event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: ".encode("utf-8") + _dumps(data) + b"\n\n"
+
+def _emit(event_type: str, data: dict):
+    """Нова подія: кодується в bytes один раз, той самий буфер — усім підписникам.
+    Синхронно і без await, тож глобальний лок не потрібен."""
+    global _last_event_id
+    _last_event_id = next(_event_ids)
+    payload = _format_event(_last_event_id, event_type, data)
+    _ring.append((_last_event_id, payload))
+    for sub in _subscribers:
+        sub.offer(_last_event_id, payload)
+
+# Кадри: message/log/status накопичуються і йдуть однією подією frame
+# не частіше SSE_MAX_RATE разів на секунду; зміна тривоги — одразу
+_status_version = 0
+_pending_messages: list[dict] = []
+_pending_logs: list[str] = []
+_frame_handle: asyncio.Handle | None = None
+_last_frame_at = 0.0
+
+def _schedule_frame():
+    global _frame_handle
+    if _frame_handle is not None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # без циклу (скрипти) слухачів нема — кадр піде з наступною подією
+    delay = _last_frame_at + 1.0 / SSE_MAX_RATE - loop.time()
+    _frame_handle = loop.call_later(delay, _flush_frame) if delay > 0 else loop.call_soon(_flush_frame)
+
+def _flush_frame():
+    """Один кадр: нові повідомлення, рядки логу і статус, якщо він змінився."""
+    global _frame_handle, _last_frame_at, _last_status_view
+    if _frame_handle is not None:
+        _frame_handle.cancel()
+        _frame_handle = None
+    try:
+        _last_frame_at = asyncio.get_running_loop().time()
+    except RuntimeError:
+        pass
+    frame = {}
+    if _pending_messages:
+        frame["messages"] = [_message_view(m) for m in _pending_messages[-30:]]
+        _pending_messages.clear()
+    if _pending_logs:
+        frame["logs"] = _pending_logs[-30:]
+        _pending_logs.clear()
+    view = _status_view()
+    if view != _last_status_view:
+        # копія, щоб наступне порівняння бачило зміни вкладених лічильників
+        _last_status_view = json.loads(json.dumps(view))
+        frame["status"] = {"uptime": _uptime(), **view}
+    if frame:
+        _emit("frame", frame)
+
+def _touch():
+    """Статус змінився — кеш /status застарів."""
+    global _status_version
+    _status_version += 1
+
+def add_message(msg: dict):
+    """Нове повідомлення у статус; в SSE — з найближчим кадром."""
+    _touch()
+    status["last_messages"].append(msg)
+    if len(status["last_messages"]) > MAX_MESSAGES:
+        status["last_messages"] = status["last_messages"][-MAX_MESSAGES:]
+    _pending_messages.append(msg)
+    _schedule_frame()
+
+def add_log(line: str):
+    """Новий рядок логу; в SSE — з найближчим кадром."""
+    _touch()
+    status["logs"].append(line)
+    if len(status["logs"]) > MAX_LOGS:
+        status["logs"] = status["logs"][-MAX_LOGS:]
+    _pending_logs.append(line)
+    _schedule_frame()
+
+def publish_status(immediate: bool = False):
+    """Статус змінився. immediate=True (тривога/відбій) — кадр іде негайно."""
+    _touch()
+    if immediate:
+        _flush_frame()
+    else:
+        _schedule_frame()
+
+async def push_update():
+    """Сумісність зі старими викликами: публікує зміни статусу (з обмеженням частоти)."""
+    publish_status()
+
+def _parse_event_id(header: str | None) -> int | None:
+    """Номер події з Last-Event-ID "<boot>-<n>"; None — порожній, битий або з
+    іншого запуску сервера (тоді клієнт отримує повний знімок)."""
+    boot, _, number = (header or "").partition("-")
+    if boot != _BOOT_ID or not number.isdigit():
+        return None
+    return int(number)
+
+def _replay_since(last_id: int) -> list[bytes] | None:
+    """Події після last_id з буфера; None — якщо буфер їх уже не містить."""
+    if last_id > _last_event_id:
+        return None
+    if last_id == _last_event_id:
+        return []
+    if not _ring or _ring[0][0] > last_id + 1:
+        return None
+    return [payload for event_id, payload in _ring if event_id > last_id]
 
 async def sse_handler(request: web.Request):
     """SSE endpoint: /events — тримає з’єднання відкритим і шле оновлення."""
@@ -61,22 +251,46 @@ async def sse_handler(request: web.Request):
     )
     await resp.prepare(request)
 
-    q: asyncio.Queue = asyncio.Queue()
-    async with _sub_lock:
-        _subscribers.add(q)
+    sub = _Subscriber()
+    _subscribers.add(sub)
+    _sse_stats["subscribers"] = len(_subscribers)
 
-    # Перший снапшот одразу
-    await resp.write(f"data: {json.dumps(_serialize_status(), ensure_ascii=False)}\n\n".encode('utf-8'))
+    # Перепідключення з Last-Event-ID — лише пропущені події; інакше повний знімок
+    header = request.headers.get("Last-Event-ID") or request.query.get("last_event_id")
+    last_id = _parse_event_id(header)
+    backlog = _replay_since(last_id) if last_id is not None else None
+    if backlog is None:
+        backlog = [_format_event(_last_event_id, "snapshot", _serialize_status())]
+    sent_id = _last_event_id
 
     try:
-        while True:
-            payload = await q.get()
-            await resp.write(payload.encode('utf-8'))
+        await resp.write(b"".join(backlog))
+        while not sub.closed:
+            if not sub.queue:
+                sub.wakeup.clear()
+                await sub.wakeup.wait()
+                continue
+            if sub.lagged:
+                # частину дельт викинуто — клієнт отримує свіжий знімок
+                sub.lagged = False
+                sub.queue.clear()
+                sent_id = _last_event_id
+                await resp.write(_format_event(sent_id, "snapshot", _serialize_status()))
+                continue
+            # усе, що накопичилось, — одним write
+            chunk = [payload for event_id, payload in sub.queue if event_id > sent_id]
+            sent_id = sub.queue[-1][0]
+            sub.queue.clear()
+            if chunk:
+                await resp.write(b"".join(chunk))
     except (asyncio.CancelledError, ConnectionResetError, RuntimeError):
         pass
     finally:
-        async with _sub_lock:
-            _subscribers.discard(q)
+        _subscribers.discard(sub)
+        _sse_stats["subscribers"] = len(_subscribers)
+        _sse_stats["dropped"] += sub.dropped
+        if sub.closed:
+            _sse_stats["disconnected"] += 1
         try:
             await resp.write_eof()
         except Exception:
@@ -85,164 +299,96 @@ async def sse_handler(request: web.Request):
 # ====== Кінець SSE інфраструктури ======
 
 
+# ====== Статичний дашборд ======
+# Оболонка сторінки не залежить від стану: читається і стискається один раз
+# при старті, віддається з ETag/304; дані — з /events і /status.
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+_CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+}
+
+
+class _StaticAsset:
+    """Файл у пам'яті: сирий + gzip (+ brotli, якщо модуль встановлено)."""
+    __slots__ = ("body", "etag", "content_type", "cache_control", "encoded")
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.encoded = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(body)
+
+    def response(self, request: web.Request) -> web.Response:
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if self.etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+        accept = request.headers.get("Accept-Encoding", "")
+        body = self.body
+        for encoding in ("br", "gzip"):
+            if encoding in self.encoded and encoding in accept:
+                body = self.encoded[encoding]
+                headers["Content-Encoding"] = encoding
+                break
+        headers["Content-Type"] = self.content_type
+        return web.Response(body=body, headers=headers)
+
+
+_assets: dict[str, _StaticAsset] = {}
+
+
+def _load_static():
+    """app.css/app.js — з версією в URL і довгим кешем; index.html — з ревалідацією."""
+    versions = {}
+    for name in ("app.css", "app.js"):
+        path = STATIC_DIR / name
+        asset = _StaticAsset(path.read_bytes(), _CONTENT_TYPES[path.suffix], "public, max-age=31536000, immutable")
+        _assets[name] = asset
+        versions[name] = asset.etag.strip('"')
+    html = (STATIC_DIR / "index.html").read_text(encoding="utf-8")
+    for name, version in versions.items():
+        html = html.replace(f"/static/{name}", f"/static/{name}?v={version}")
+    _assets["index.html"] = _StaticAsset(html.encode("utf-8"), _CONTENT_TYPES[".html"], "no-cache")
+
+
 async def index(request):
-    html = f"""
-    <!DOCTYPE html>
-    <html lang="uk">
-    <head>
-        <meta charset="UTF-8" />
-        <title>Статус Бота</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 0; padding: 0; }}
-            header {{ background: #2a9d8f; color: white; padding: 1rem; font-size: 1.1rem; text-align:center; }}
-            main {{ display: grid; grid-template-columns: 340px 1fr; grid-template-rows: auto 1fr; height: calc(100vh - 3rem); }}
-            .controls {{ grid-column: 1 / -1; padding: 0.8rem 1rem; border-bottom: 1px solid #ddd; display: flex; gap: 0.5rem; align-items: center; }}
-            aside {{ padding: 1rem; border-right: 1px solid #ddd; overflow-y: auto; }}
-            section {{ padding: 1rem; display: flex; flex-direction: column; overflow: hidden; }}
-            #logs {{ flex-grow: 1; border-top: 1px solid #ddd; padding-top: 1rem; overflow-y: auto; background: #f9f9f9; font-size: 0.9rem; }}
-            h2 {{ margin-top: 0; }}
-            .alert-active {{ color: #e76f51; font-weight: bold; }}
-            .alert-inactive {{ color: #264653; font-weight: normal; }}
-            .message {{ margin-bottom: 0.5rem; border-bottom: 1px solid #ccc; padding-bottom: 0.3rem; }}
-            a {{ color: #0a66c2; text-decoration: none; }}
-            a:hover {{ text-decoration: underline; }}
-            select, input[type="text"] {{ padding: 6px 8px; }}
-            button {{ padding: 8px 12px; cursor: pointer; border: 0; border-radius: 8px; }}
-            .btn-alarm {{ background: #e76f51; color: #fff; }}
-            .btn-clear {{ background: #2a9d8f; color: #fff; }}
-            .hint {{ font-size: 12px; color: #666; margin-left: 8px; }}
-        </style>
-    </head>
-    <body>
-        <header id="header_bar">
-            Статус тривоги: <span id="alert_status" class="{ 'alert-active' if status['alert_active'] else 'alert-inactive' }">
-                {"АКТИВНА" if status['alert_active'] else "ВІДСУТНЯ"}
-            </span>
-            | Отримано повідомлень: {status['messages_received']}
-            | Час роботи: {str(datetime.now() - status['start_time']).split('.')[0]}
-        </header>
-
-        <div class="controls">
-            <label for="district">Район:</label>
-            <select id="district">
-                <option value="Київська область">Київська область</option>
-                <option value="Броварський район">Броварський район</option>
-            </select>
-
-            <input type="text" id="threat" placeholder="Тип загрози (необов'язково) — ракета/шахед/балістика…" style="flex:1; min-width:260px;" />
-
-            <button class="btn-alarm" onclick="manualAlarm()">Дати тривогу</button>
-            <button class="btn-clear" onclick="manualClear()">Відбій тривоги</button>
-            <span class="hint">Кнопки працюють як «ручні» події — бот надішле алерт/відбій у канал.</span>
-        </div>
-
-        <main>
-            <aside>
-                <h2>Останні повідомлення</h2>
-                <div id="messages">
-                    {"".join([f'<div class="message"><a href="{m.get("url","#")}" target="_blank">{(m.get("text","") or "")[:100]}</a></div>' for m in reversed(status['last_messages'][-30:])])}
-                </div>
-            </aside>
-            <section>
-                <h2>Логи / Статус</h2>
-                <div id="logs">
-                    {"<br>".join(status['logs'][-30:])}
-                </div>
-            </section>
-        </main>
-
-        <script>
-            function applySnapshot(data) {{
-                const st = document.getElementById('alert_status');
-                st.textContent = data.alert_active ? "АКТИВНА" : "ВІДСУТНЯ";
-                st.className = data.alert_active ? "alert-active" : "alert-inactive";
-
-                const header = document.getElementById('header_bar');
-                header.innerHTML = `Статус тривоги: <span id="alert_status" class="${{data.alert_active ? "alert-active" : "alert-inactive"}}">${{data.alert_active ? "АКТИВНА" : "ВІДСУТНЯ"}}</span> | Отримано повідомлень: ${{data.messages_received}} | Час роботи: ${{data.uptime}}`;
-
-                const msgs = (data.last_messages || []).map(m => `
-                    <div class="message">
-                        <a href="${{m.url || "#"}}" target="_blank">${{(m.text || "").slice(0,100)}}</a>
-                    </div>
-                `).reverse().join('');
-                document.getElementById('messages').innerHTML = msgs;
-
-                document.getElementById('logs').innerHTML = (data.logs || []).slice(-30).join('<br>');
-            }}
-
-            // Підписка на SSE
-            const ev = new EventSource('/events');
-            ev.onmessage = (e) => {{
-                try {{
-                    const data = JSON.parse(e.data);
-                    applySnapshot(data);
-                }} catch (err) {{
-                    console.error('Bad SSE data', err);
-                }}
-            }};
-            ev.onerror = (e) => {{
-                console.warn('SSE error, fallback to polling for a while...', e);
-            }};
-
-            // Фолбек-пулінг (на випадок, якщо SSE тимчасово впаде)
-            async function pollOnce() {{
-                try {{
-                    const res = await fetch('/status', {{ cache: 'no-store' }});
-                    if (res.ok) {{
-                        const data = await res.json();
-                        applySnapshot(data);
-                    }}
-                }} catch (e) {{
-                    console.error('poll error', e);
-                }}
-            }}
-            setInterval(pollOnce, 15000);
-
-            async function postJSON(url, body) {{
-                const res = await fetch(url, {{
-                    method: 'POST',
-                    headers: {{ 'Content-Type': 'application/json' }},
-                    body: JSON.stringify(body || {{}})
-                }});
-                if (!res.ok) throw new Error('Request failed');
-                return await res.json();
-            }}
-
-            function readControls() {{
-                const district = document.getElementById('district').value;
-                const threat = document.getElementById('threat').value.trim();
-                return {{ district, threat: threat || null }};
-            }}
-
-            async function manualAlarm() {{
-                const data = readControls();
-                try {{
-                    await postJSON('/manual-alarm', data);
-                }} catch(e) {{
-                    console.error(e);
-                    alert('Не вдалося встановити тривогу');
-                }}
-            }}
-
-            async function manualClear() {{
-                const data = readControls();
-                try {{
-                    await postJSON('/manual-clear', data);
-                }} catch(e) {{
-                    console.error(e);
-                    alert('Не вдалося зняти тривогу');
-                }}
-            }}
-        </script>
-    </body>
-    </html>
-    """
-    return web.Response(text=html, content_type='text/html')
+    return _assets["index.html"].response(request)
+
+
+async def static_handler(request):
+    asset = _assets.get(request.match_info["name"])
+    if asset is None:
+        raise web.HTTPNotFound()
+    return asset.response(request)
 
 
+# Кеш /status: повний JSON перекодовується лише коли статус змінився (або раз
+# на хвилину — заради uptime); ETag = запуск (_BOOT_ID) + версія, тож пулінг
+# отримує 304. Версію рухають add_message/add_log/publish_status, а скалярні
+# лічильники (coalesce, dedup, sse), які пишуться напряму, входять у ключ
+# через відбиток самого _status_view() — він малий, на відміну від повідомлень.
+_status_cache: dict = {"key": None, "body": b"", "etag": ""}
+
 async def status_handler(request):
     """JSON-ендпоінт як фолбек та для дебага."""
-    return web.json_response(_serialize_status())
+    view = hashlib.blake2b(_dumps(_status_view()), digest_size=6).hexdigest()
+    key = (_status_version, view, int(time.monotonic() // 60))
+    if _status_cache["key"] != key:
+        _status_cache["key"] = key
+        _status_cache["body"] = _dumps(_serialize_status())
+        _status_cache["etag"] = f'"{_BOOT_ID}-{key[0]}-{view}-{key[2]}"'
+    headers = {"ETag": _status_cache["etag"], "Cache-Control": "no-cache"}
+    if _status_cache["etag"] in request.headers.get("If-None-Match", ""):
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=_status_cache["body"], content_type="application/json", headers=headers)
 
 
 # ====== Ручні події з веб-UI ======
@@ -256,7 +402,7 @@ async def manual_alarm_handler(request: web.Request):
     except Exception:
         payload = {}
 
-    district = payload.get("district") or "Київська область"
+    district = payload.get("district") or REGISTRY.titles[0]
     threat = payload.get("threat") or None
 
     # Локальний імпорт, щоб не створювати циклічну залежність на рівні модулів
@@ -268,18 +414,14 @@ async def manual_alarm_handler(request: web.Request):
         "district": district,
         "text": f"[Manual] Повітряна тривога — {district} (з веб)",
         "url": "manual://web",
-        "id": now_id,
+        "id": make_message_id("manual", now_id),
     }
     if threat:
         fake["threat_type"] = threat
 
-    await tg_checker.message_queue.put(fake)
-
-    status["logs"].append(f"🔴 [Manual] Дано тривогу: {district}" + (f" (загроза: {threat})" if threat else ""))
-    if len(status["logs"]) > 100:
-        status["logs"] = status["logs"][-100:]
+    tg_checker.enqueue_message(fake)
 
-    await push_update()
+    add_log(f"🔴 [Manual] Дано тривогу: {district}" + (f" (загроза: {threat})" if threat else ""))
     return web.json_response({"ok": True})
 
 
@@ -292,7 +434,7 @@ async def manual_clear_handler(request: web.Request):
     except Exception:
         payload = {}
 
-    district = payload.get("district") or "Київська область"
+    district = payload.get("district") or REGISTRY.titles[0]
 
     from alert_sources import telegram_checker as tg_checker
 
@@ -302,23 +444,21 @@ async def manual_clear_handler(request: web.Request):
         "district": district,
         "text": f"[Manual] Відбій тривоги — {district} (з веб)",
         "url": "manual://web",
-        "id": now_id,
+        "id": make_message_id("manual", now_id),
     }
-    await tg_checker.message_queue.put(fake)
-
-    status["logs"].append(f"🟢 [Manual] Відбій тривоги: {district}")
-    if len(status["logs"]) > 100:
-        status["logs"] = status["logs"][-100:]
+    tg_checker.enqueue_message(fake)
 
-    await push_update()
+    add_log(f"🟢 [Manual] Відбій тривоги: {district}")
     return web.json_response({"ok": True})
 # ====== Кінець ручних подій ======
 
 
 async def start_web_server():
+    _load_static()
     app = web.Application()
     app.add_routes([
         web.get('/', index),
+        web.get('/static/{name}', static_handler),
         web.get('/status', status_handler),     # фолбек
         web.get('/events', sse_handler),        # live-оновлення
         web.post('/manual-alarm', manual_alarm_handler),
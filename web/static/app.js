@@ -0,0 +1,126 @@
+// Дашборд — статичний: уся динаміка приходить з /events (SSE) і /status.
+const logLines = [];
+
+function applySnapshot(data) {
+    applyStatus(data);
+    applyRegions(data.regions || []);
+
+    const box = document.getElementById('messages');
+    box.innerHTML = '';
+    (data.last_messages || []).slice(-30).forEach(addMessage);
+
+    logLines.splice(0, logLines.length, ...(data.logs || []).slice(-30));
+    document.getElementById('logs').innerHTML = logLines.join('<br>');
+}
+
+function applyRegions(titles) {
+    const select = document.getElementById('district');
+    if (select.options.length === titles.length) return;
+    select.innerHTML = titles.map(t => `<option value="${escapeHtml(t)}">${escapeHtml(t)}</option>`).join('');
+}
+
+function applyStatus(data) {
+    const header = document.getElementById('header_bar');
+    header.innerHTML = `Статус тривоги: <span id="alert_status" class="${data.alert_active ? "alert-active" : "alert-inactive"}">${data.alert_active ? "АКТИВНА" : "ВІДСУТНЯ"}</span> | Отримано повідомлень: ${data.messages_received} | Час роботи: ${data.uptime}`;
+}
+
+function escapeHtml(s) {
+    return s.replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c]));
+}
+
+function addMessage(m) {
+    const box = document.getElementById('messages');
+    const div = document.createElement('div');
+    div.className = 'message';
+    div.innerHTML = `<a href="${escapeHtml(m.url || "#")}" target="_blank">${escapeHtml((m.text || "").slice(0,100))}</a>`;
+    box.prepend(div);
+    while (box.children.length > 30) box.lastElementChild.remove();
+}
+
+function addLog(line) {
+    logLines.push(line);
+    if (logLines.length > 30) logLines.shift();
+    document.getElementById('logs').innerHTML = logLines.join('<br>');
+}
+
+function handle(fn) {
+    return (e) => {
+        try {
+            fn(JSON.parse(e.data));
+        } catch (err) {
+            console.error('Bad SSE data', err);
+        }
+    };
+}
+
+// Підписка на SSE: повний знімок лише при підключенні, далі — дельти.
+// Після обриву браузер сам шле Last-Event-ID і отримує пропущене.
+const ev = new EventSource('/events');
+ev.addEventListener('snapshot', handle(applySnapshot));
+ev.addEventListener('frame', handle(frame => {
+    (frame.messages || []).forEach(addMessage);
+    (frame.logs || []).forEach(addLog);
+    if (frame.status) applyStatus(frame.status);
+}));
+ev.onerror = (e) => {
+    console.warn('SSE error, fallback to polling for a while...', e);
+};
+
+// Фолбек-пулінг (на випадок, якщо SSE тимчасово впаде): поки SSE живий — не
+// ходимо зовсім; інакше умовний запит, і без змін сервер відповідає 304
+let statusEtag = null;
+async function pollOnce() {
+    if (ev.readyState === EventSource.OPEN) return;
+    try {
+        const res = await fetch('/status', {
+            cache: 'no-store',
+            headers: statusEtag ? { 'If-None-Match': statusEtag } : {},
+        });
+        if (res.status === 304) return;
+        if (res.ok) {
+            statusEtag = res.headers.get('ETag');
+            const data = await res.json();
+            applySnapshot(data);
+        }
+    } catch (e) {
+        console.error('poll error', e);
+    }
+}
+setInterval(pollOnce, 15000);
+
+async function postJSON(url, body) {
+    const res = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body || {})
+    });
+    if (!res.ok) throw new Error('Request failed');
+    return await res.json();
+}
+
+function readControls() {
+    const district = document.getElementById('district').value;
+    const threat = document.getElementById('threat').value.trim();
+    return { district, threat: threat || null };
+}
+
+async function manualAlarm() {
+    const data = readControls();
+    try {
+        await postJSON('/manual-alarm', data);
+    } catch(e) {
+        console.error(e);
+        alert('Не вдалося встановити тривогу');
+    }
+}
+
+async function manualClear() {
+    const data = readControls();
+    try {
+        await postJSON('/manual-clear', data);
+    } catch(e) {
+        console.error(e);
+        alert('Не вдалося зняти тривогу');
+    }
+}
+